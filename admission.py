@@ -0,0 +1,46 @@
+# admission.py
+import threading
+
+
+class AdmissionController:
+    """Bounded concurrency for database work, with a bounded, deadline-limited wait queue.
+
+    At most `limit` callers hold a slot; up to `max_waiting` more wait for one, each for at most
+    its own deadline. Everything past that is refused at once so the caller can shed the request
+    (serve a snapshot, answer 503) instead of queueing on the connection pool.
+    """
+
+    def __init__(self, limit, max_waiting):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.shed = 0
+
+    def acquire(self, deadline):
+        """Take a slot, waiting up to `deadline` seconds; False when the request should be shed."""
+        if self._slots.acquire(blocking=False):
+            return True
+        with self._lock:
+            queue_full = self._waiting >= self.max_waiting or deadline <= 0
+            if not queue_full:
+                self._waiting += 1
+        admitted = False
+        if not queue_full:
+            try:
+                admitted = self._slots.acquire(timeout=deadline)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        if not admitted:
+            with self._lock:
+                self.shed += 1
+        return admitted
+
+    def release(self):
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {"limit": self.limit, "waiting": self._waiting, "shed": self.shed}
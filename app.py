@@ -1,17 +1,33 @@
 # --- Imports ---
-from flask import Flask, render_template, request, jsonify, redirect, url_for, make_response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, make_response, abort, stream_with_context, g
+from markupsafe import Markup
 import json
 import os
 import sys
 import base64
+import hashlib
+import hmac
 from dotenv import load_dotenv
 import firebase_admin
 from firebase_admin import auth as fb_auth, credentials
 from functools import wraps
 from flask_migrate import Migrate, upgrade as migrate_upgrade
-from sqlalchemy import func
+from sqlalchemy import or_, select
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from types import SimpleNamespace as NS
+from templating import init_templating, compile_templates_command
+from fastjson import FastJSONProvider
+from dto import HeaderView, BannerView, AboutView, AdditionalServicesView, ContactView, FooterView
+from fragments import (SECTIONS, cached_homepage, stream_homepage, banner_for_preload, render_static_sections,
+                       last_good_homepage)
+from cdn import cache_homepage, keep_private, tag_media
+from admission import AdmissionController
+from cache import cache
+from images import UPLOAD_LIMITS, image_identity, image_metadata
+from image_storage import IMAGE_FIELDS, image_payload, set_image, storage_values, stored_image
+import jobs
+from routing import run_on_replica, replica_reads, mark_primary_reads
+import repository
 
 
 print("--- app.py execution started ---")
@@ -21,6 +37,9 @@ print("DEBUG: Loaded .env file")
 
 # --- App Initialization ---
 app = Flask(__name__)
+# jsonify/request.json go through orjson when it is installed (see fastjson.py)
+app.json_provider_class = FastJSONProvider
+app.json = FastJSONProvider(app)
 
 @app.get("/healthz")
 def healthz():
@@ -31,6 +50,11 @@ app.secret_key = os.getenv('FLASK_SECRET_KEY') or 'super-fallback-secret-key-not
 if not os.getenv('FLASK_SECRET_KEY'):
     print("Warning: FLASK_SECRET_KEY not set. Using default for development.")
 
+# --- Template Caching ---
+# Bytecode cache + build-time precompiled templates so cold starts skip Jinja compilation.
+init_templating(app)
+app.cli.add_command(compile_templates_command)
+
 # --- Firebase Initialization ---
 firebase_admin_initialized = False
 auth = None
@@ -75,9 +99,31 @@ db_config_ok = False
 db = None
 migrate = None
 
+from content_file import DEFAULT_CONTENT_FILE, content_file_read_only, content_file_uri, tune_content_file
+
+ALLOW_NO_DB = os.getenv("ALLOW_NO_DB", "0") == "1"
+# CONTENT_FILE: run the whole site (homepage, CMS, jobs) from one local SQLite file instead of a network
+# database. ALLOW_NO_DB deployments use the bundled content.db when there is one. Move content between
+# the two with `flask export-content` and `flask import-content`.
+CONTENT_FILE = os.getenv("CONTENT_FILE") or (
+    DEFAULT_CONTENT_FILE if ALLOW_NO_DB and os.path.exists(DEFAULT_CONTENT_FILE) else None)
+CONTENT_FILE_READ_ONLY = False
+if CONTENT_FILE and not os.path.exists(CONTENT_FILE) and content_file_read_only(os.path.abspath(CONTENT_FILE)):
+    print(f"Warning: content file {CONTENT_FILE} does not exist and can't be created here; not using it.")
+    CONTENT_FILE = None
 USE_CONNECTOR = bool(os.getenv("INSTANCE_CONNECTION_NAME"))  # if present, prefer connector
 
-if USE_CONNECTOR:
+if CONTENT_FILE:
+    # ---- Content file path (no network database, no connection setup cost) ----
+    CONTENT_FILE = os.path.abspath(CONTENT_FILE)
+    CONTENT_FILE_READ_ONLY = content_file_read_only(CONTENT_FILE)
+    content_file_created = not os.path.exists(CONTENT_FILE)
+    print(f"DB: Using content file {CONTENT_FILE}{' (read-only)' if CONTENT_FILE_READ_ONLY else ''}")
+    app.config["SQLALCHEMY_DATABASE_URI"] = content_file_uri(CONTENT_FILE, CONTENT_FILE_READ_ONLY)
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db_config_ok = True
+
+elif USE_CONNECTOR:
     # ---- Cloud SQL Python Connector path (no IP allow-listing) ----
     print("DB: Using Cloud SQL Python Connector")
 # --- inside the USE_CONNECTOR block ---
@@ -105,10 +151,10 @@ if USE_CONNECTOR:
 
     connector = Connector(credentials=credentials)
 
-    def getconn():
+    def getconn(instance_connection_name=INSTANCE_CONNECTION_NAME):
         # Returns a pg8000 DB-API connection; SQLAlchemy will use this instead of a URL socket
         conn = connector.connect(
-            INSTANCE_CONNECTION_NAME,
+            instance_connection_name,
             driver="pg8000",
             user=DB_USER,
             password=DB_PASS,
@@ -129,19 +175,39 @@ if USE_CONNECTOR:
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     db_config_ok = True
 
+    # Optional read replica: same credentials, separate Cloud SQL instance
+    REPLICA_INSTANCE_CONNECTION_NAME = os.getenv("REPLICA_INSTANCE_CONNECTION_NAME")
+    if REPLICA_INSTANCE_CONNECTION_NAME:
+        print("DB: Read replica configured via Cloud SQL Connector")
+        app.config["SQLALCHEMY_BINDS"] = {
+            "replica": dict(app.config["SQLALCHEMY_ENGINE_OPTIONS"],
+                            url="postgresql+pg8000://",
+                            creator=lambda: getconn(REPLICA_INSTANCE_CONNECTION_NAME)),
+        }
+
 else:
     # ---- URL path (Neon/local/Postgres/GCP Public IP) ----
     print("DB: Using URL from env (DATABASE_URL/POSTGRES_URL/POSTGRES_URL_NO_SSL)")
+    def _normalize_database_uri(uri):
+        if uri.startswith("postgres://"):
+            uri = uri.replace("postgres://", "postgresql://", 1)
+        if "sslmode=" not in uri:
+            uri = f"{uri}{'&' if '?' in uri else '?'}sslmode=require"
+        return uri
+
     database_uri = os.getenv("DATABASE_URL") or os.getenv("POSTGRES_URL") or os.getenv("POSTGRES_URL_NO_SSL")
     if database_uri:
-        if database_uri.startswith("postgres://"):
-            database_uri = database_uri.replace("postgres://", "postgresql://", 1)
-        if "sslmode=" not in database_uri:
-            database_uri = f"{database_uri}{'&' if '?' in database_uri else '?'}sslmode=require"
+        database_uri = _normalize_database_uri(database_uri)
         app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
         app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
         print("Database URI loaded from environment variable:", database_uri)
         db_config_ok = True
+
+        # Optional read replica for homepage and CMS GET traffic
+        replica_uri = os.getenv("DATABASE_REPLICA_URL")
+        if replica_uri:
+            app.config["SQLALCHEMY_BINDS"] = {"replica": {"url": _normalize_database_uri(replica_uri), "pool_pre_ping": True}}
+            print("DB: Read replica configured from DATABASE_REPLICA_URL")
     else:
         print("Warning: DATABASE_URL/POSTGRES_URL not set. Database connection not configured.")
 
@@ -158,8 +224,30 @@ if db_config_ok:
         print("SQLAlchemy initialized successfully.")
         migrate = Migrate(app, db)
         print("Flask-Migrate initialized successfully.")
+        if CONTENT_FILE:
+            # Before the click counter: its flush at exit must run before the file is checkpointed
+            with app.app_context():
+                tune_content_file(db.engine, CONTENT_FILE_READ_ONLY)
+                if content_file_created:
+                    migrate_upgrade()
+                    print(f"Created content file {CONTENT_FILE}; load content with `flask import-content`.")
         print("DEBUG: Importing models")
-        from models import Header, Banner, About, WhyChoose, Highlight, Service, Event, TeamMember, Contact, Footer
+        from models import Header, Banner, About, WhyChoose, Highlight, Service, Event, TeamMember, Contact, Footer, Job
+        from content_version import get_section_versions, version_tag, MODEL_SECTIONS
+        from counters import init_click_counter, count_homepage_visit, displayed_clicks, pending_visits
+        if not CONTENT_FILE_READ_ONLY:
+            init_click_counter(app)
+        app.after_request(mark_primary_reads)
+        from transfer import export_content_command, import_content_command
+        app.cli.add_command(export_content_command)
+        app.cli.add_command(import_content_command)
+        app.cli.add_command(jobs.run_jobs_command)
+        from schema_state import check_schema, record_schema_state, schema_recorded, upgrade_to_head, upgrade_schema_command
+        app.cli.add_command(upgrade_schema_command)
+        from data_migrations import data_migrations_command, run_data_migration_command, pause_data_migration_command
+        app.cli.add_command(data_migrations_command)
+        app.cli.add_command(run_data_migration_command)
+        app.cli.add_command(pause_data_migration_command)
         print("Models imported successfully.")
     except Exception as e:
         print(f"Error initializing SQLAlchemy or Flask-Migrate: {str(e)}")
@@ -171,12 +259,16 @@ else:
 
 
 # --- Vercel Build Step: Run Migrations ---
+# The build records what it migrated in build/schema_state.json; if this flag leaks into the runtime
+# environment, instances of that build find the record and skip the database round trip
 if os.getenv('RUN_VERCEL_MIGRATIONS') == '1' and db_config_ok and db and migrate:
-    print("Running database migrations during Vercel build...")
     with app.app_context():
         try:
-            migrate_upgrade()
-            print("Database migration completed successfully.")
+            if not schema_recorded():
+                print("Running database migrations during Vercel build...")
+                upgrade_to_head()
+                record_schema_state()
+                print("Database migration completed successfully.")
         except Exception as e:
             print(f"Database migration failed: {e}")
 
@@ -191,7 +283,92 @@ with app.app_context():
 # --- Helpers ---
 COOKIE_NAME = 'token'
 LOGIN_ENDPOINT = 'login'
-ALLOW_NO_DB = os.getenv("ALLOW_NO_DB", "0") == "1"
+# A content file is a database of its own, so with one ALLOW_NO_DB serves the real site
+ALLOW_NO_DB = ALLOW_NO_DB and not CONTENT_FILE
+# Verified session cookies are reused for this long (so revocation takes effect within it)
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', '60'))
+API_CACHE_TTL = int(os.getenv('API_CACHE_TTL', '300'))
+MEDIA_CACHE_TTL = int(os.getenv('MEDIA_CACHE_TTL', '86400'))
+# Streamed API bodies larger than this are sent but not cached
+API_CACHE_MAX_BODY = int(os.getenv('API_CACHE_MAX_BODY', str(4 * 1024 * 1024)))
+LIST_PAGE_MAX = 200  # upper bound for ?limit= on list endpoints
+
+# --- Admission Control ---
+# The homepage and API writes hold one of ADMISSION_LIMIT slots (default: the primary pool's size plus
+# overflow) while they run. Up to ADMISSION_MAX_WAITING more requests wait for a slot, the homepage
+# for HOMEPAGE_QUEUE_DEADLINE seconds and writes for WRITE_QUEUE_DEADLINE; the rest are shed at once:
+# the homepage gets the last rendered snapshot, writes a 503 with Retry-After.
+def _pool_capacity():
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    return options.get("pool_size", 5) + options.get("max_overflow", 10)
+
+ADMISSION_LIMIT = int(os.getenv('ADMISSION_LIMIT', str(_pool_capacity())))
+ADMISSION_MAX_WAITING = int(os.getenv('ADMISSION_MAX_WAITING', str(ADMISSION_LIMIT * 4)))
+HOMEPAGE_QUEUE_DEADLINE = float(os.getenv('HOMEPAGE_QUEUE_DEADLINE', '0.25'))
+WRITE_QUEUE_DEADLINE = float(os.getenv('WRITE_QUEUE_DEADLINE', '2'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '2'))
+admission = AdmissionController(ADMISSION_LIMIT, ADMISSION_MAX_WAITING)
+
+def _shed_homepage():
+    html = last_good_homepage()
+    if html is None:
+        # Nothing rendered yet in this process: the static site needs no database either
+        return render_template('index.html', sections=render_static_sections(_static_ctx()))
+    response = make_response(html)
+    # Let the CDN absorb the spike for a moment, but not hold on to a snapshot that may be behind
+    response.headers['Cache-Control'] = f'public, max-age=0, s-maxage={ADMISSION_RETRY_AFTER}'
+    return response
+
+@app.before_request
+def check_schema_once():
+    """On a process's first request, make sure the database schema matches this code (see schema_state.py)."""
+    if db is None or ALLOW_NO_DB:
+        return None
+    try:
+        check_schema(can_migrate=not CONTENT_FILE_READ_ONLY)
+    except Exception as e:
+        # Not only SQLAlchemyError: connector and pool-creator failures (OSError etc.) pass through
+        # unwrapped, and the views' own fallbacks (the static homepage) must still get to run
+        app.logger.error("Schema check failed, retrying on the next request: %s", e)
+    return None
+
+@app.before_request
+def admit_db_request():
+    """Hold a database slot for the homepage and API writes, shedding requests that can't get one in time."""
+    if db is None or ALLOW_NO_DB:
+        return None
+    if request.endpoint == 'index':
+        if admission.acquire(HOMEPAGE_QUEUE_DEADLINE):
+            g.db_slot = True
+            return None
+        print(f"Warning: homepage over capacity, serving snapshot ({admission.stats()})")
+        return _shed_homepage()
+    if request.path.startswith('/api/') and request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+        if CONTENT_FILE_READ_ONLY:
+            return jsonify({"error": "This deployment serves a read-only content file; edit a writable copy "
+                                     "and deploy it (flask export-content / import-content)."}), 503
+        if admission.acquire(WRITE_QUEUE_DEADLINE):
+            g.db_slot = True
+            return None
+        print(f"Warning: API write over capacity, shedding {request.method} {request.path} ({admission.stats()})")
+        response = jsonify({"error": "Server busy, please retry shortly."})
+        response.headers['Retry-After'] = str(ADMISSION_RETRY_AFTER)
+        return response, 503
+    return None
+
+@app.teardown_request
+def release_db_slot(exc):
+    if g.pop('db_slot', False):
+        # Hand the connection back to the pool before the next request is admitted
+        db.session.remove()
+        admission.release()
+
+def _hold_db_slot(response):
+    """Keep the request's database slot until a streamed body has been sent: teardown runs when the view
+    returns, before the body renders its sections. Skips the release in release_db_slot."""
+    if g.pop('db_slot', False):
+        response.call_on_close(admission.release)
+    return response
 
 def _static_ctx():
     """Return a safe, attribute-friendly context for templates (no DB)."""
@@ -218,6 +395,9 @@ def handle_unauthorized(is_api, error_message, redirect_to=LOGIN_ENDPOINT):
     response.set_cookie(COOKIE_NAME, '', expires=0, httponly=True, secure=True, samesite='Lax')
     return response, (401 if is_api else 302)
 
+def _token_cache_key(id_token):
+    return hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -239,8 +419,12 @@ def login_required(f):
             )
 
         try:
-            # Verify session cookie
-            decoded_token = auth.verify_session_cookie(id_token, check_revoked=True)
+            # Verify session cookie (cached briefly so every CMS call doesn't hit Firebase)
+            token_key = _token_cache_key(id_token)
+            decoded_token = cache.get('auth', token_key)
+            if decoded_token is None:
+                decoded_token = auth.verify_session_cookie(id_token, check_revoked=True)
+                cache.set('auth', token_key, decoded_token, ttl=AUTH_CACHE_TTL)
             request.user = decoded_token  # Attach user info
             return f(*args, **kwargs)
         except (fb_auth.InvalidSessionCookieError, fb_auth.RevokedSessionCookieError, fb_auth.FirebaseError):
@@ -257,6 +441,194 @@ def login_required(f):
             )
     return decorated_function
 
+def cached_section_json(section):
+    """Serve a GET endpoint's JSON from the shared cache, keyed by its section's content version."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if db is None:
+                return f(*args, **kwargs)
+            key = f"{request.full_path}:{get_section_versions().get(section, 0)}"
+            body = cache.get('api', key)
+            if body is not None:
+                return app.response_class(body, mimetype='application/json')
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                if response.is_streamed:
+                    response.response = _tee_to_cache(response.response, 'api', key, API_CACHE_TTL)
+                else:
+                    cache.set('api', key, response.get_data(), ttl=API_CACHE_TTL)
+            return response
+        return decorated_function
+    return decorator
+
+def _tee_to_cache(chunks, namespace, key, ttl):
+    """Pass a streamed body through, caching it once fully sent (unless it outgrew API_CACHE_MAX_BODY)."""
+    parts, size = [], 0
+    for chunk in chunks:
+        if parts is not None:
+            data = chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')
+            size += len(data)
+            parts = None if size > API_CACHE_MAX_BODY else parts
+            if parts is not None:
+                parts.append(data)
+        yield chunk
+    if parts is not None:
+        cache.set(namespace, key, b''.join(parts), ttl=ttl)
+
+def _list_response(model, fields, *criteria):
+    """Stream an ordered collection as JSON, row by row from a server-side cursor.
+
+    Query parameters: fields=a,b (subset of `fields`; id and order_id are always included),
+    limit=N (keyset pagination: the body becomes {"items": [...], "next": cursor}) and
+    after=<cursor> from a previous page. Without limit the body is the plain array of all rows.
+    """
+    requested = request.args.get('fields')
+    if requested:
+        wanted = set(requested.split(',')) | {'id', 'order_id'}
+        unknown = wanted - set(fields)
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+        fields = [field for field in fields if field in wanted]
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, LIST_PAGE_MAX))
+    after = request.args.get('after')
+    if after:
+        try:
+            after = tuple(int(part) for part in after.split(':'))
+        except ValueError:
+            after = ()
+        if len(after) != 2:
+            return jsonify({"error": "Invalid cursor."}), 400
+    columns = [getattr(model, field) for field in fields]
+    binary = 'image' in fields  # uploaded images are stored as bytes and sent as data URLs
+    if binary:
+        columns += [model.image_data, model.image_mime]
+    rows = repository.page(model, columns, *criteria, after=after or None, limit=limit)
+
+    def generate():
+        yield b'[' if limit is None else b'{"items":['
+        count, last = 0, None
+        for row in rows:
+            if count:
+                yield b','
+            mapping = row._mapping
+            if binary:
+                mapping = dict(mapping)
+                mapping['image'] = stored_image(mapping['image'], mapping.pop('image_data'), mapping.pop('image_mime'))
+            yield from app.json.encode_row(mapping)
+            count, last = count + 1, row
+        if limit is None:
+            yield b']'
+        else:
+            next_cursor = f"{last.order_id}:{last.id}" if count == limit else None
+            yield b'],"next":' + app.json.dumps_bytes(next_cursor) + b'}'
+
+    response = app.response_class(stream_with_context(generate()), mimetype='application/json')
+    response.call_on_close(rows.close)  # runs even if the body is never iterated (HEAD, disconnects)
+    return response
+
+def _apply_image(obj, data):
+    """Set obj.image from request data with its content hash; _queue_image_job fills in the rest later."""
+    if 'image' in data:
+        set_image(obj, 'image', data['image'])
+        for column, value in image_identity(data['image']).items():
+            setattr(obj, column, value)
+
+# --- Background Jobs ---
+@jobs.handler('image_metadata')
+def image_metadata_job(table, id, image_hash):
+    """Decode an uploaded image and store its size, colour and placeholder (unless it was replaced meanwhile)."""
+    model = {m.__tablename__: m for m in (Banner, Highlight, Event, TeamMember)}[table]
+    criteria = (model.id == id, model.image_hash == image_hash)
+    row = db.session.execute(select(model.image, model.image_data, model.image_mime).where(*criteria)).first()
+    if row is None:
+        return {"skipped": "image replaced or row deleted"}
+    meta = image_metadata(stored_image(*row))
+    repository.set_derived(model, meta, *criteria)
+    return {"image_width": meta['image_width'], "image_height": meta['image_height'], "image_color": meta['image_color']}
+
+def _queue_image_metadata(model, id, image_hash):
+    if image_hash:
+        job = jobs.enqueue('image_metadata', table=model.__tablename__, id=id, image_hash=image_hash)
+        g.setdefault('queued_jobs', []).append(job.id)
+
+def _queue_image_job(obj):
+    """Queue the image decoding for a new row in the same transaction as the row itself."""
+    db.session.flush()  # assigns obj.id
+    _queue_image_metadata(type(obj), obj.id, obj.image_hash)
+
+def _with_queued_jobs(body):
+    """Add the ids of background jobs this request queued (the CMS can poll /api/jobs/<id>)."""
+    if g.get('queued_jobs'):
+        body['jobs'] = g.queued_jobs
+    return body
+
+def _if_match_version():
+    """Row version the client expects, from If-Match ("3" or W/"3"); None when absent or "*"."""
+    value = request.headers.get('If-Match', '').strip()
+    if not value or value == '*':
+        return None
+    try:
+        return int(value.removeprefix('W/').strip('"'))
+    except ValueError:
+        return -1  # never matches a real version
+
+def _patch_row(model, data, fields, *criteria):
+    """Apply the provided `fields` of `data` in one UPDATE ... RETURNING; returns (row, status).
+
+    status is 404 when no row matched, or 412 when an If-Match precondition was given and failed.
+    """
+    values = {field: data[field] for field in fields if field in data}
+    if 'image' in values:
+        values.update(image_identity(values['image']))
+    if IMAGE_FIELDS.get(model) in values:
+        field = IMAGE_FIELDS[model]
+        values.update(storage_values(field, values[field]))
+    expected = _if_match_version()
+    if expected is not None:
+        criteria += (model.version == expected,)
+    row = repository.patch(model, values, *criteria)
+    if row is None:
+        db.session.rollback()
+        return None, 412 if expected is not None else 404
+    if 'image' in values:
+        _queue_image_metadata(model, row.id, values['image_hash'])
+    db.session.commit()
+    return row, 200
+
+def _patch_response(row, status, message, not_found):
+    if status == 412:
+        return jsonify({"error": "Precondition failed: the item was changed by someone else. Reload and try again."}), 412
+    if status == 404:
+        return jsonify({"message": not_found}), 404
+    response = jsonify(_with_queued_jobs({"message": message, "id": row.id, "version": row.version}))
+    response.headers['ETag'] = f'"{row.version}"'
+    return response
+
+@app.template_global()
+def image_src(obj):
+    """URL for a model's image: the content-hashed /media URL when known, else the stored value."""
+    digest = getattr(obj, 'image_hash', None)
+    if digest and getattr(obj, 'id', None) is not None:
+        model = getattr(obj, 'model', type(obj))  # dto view objects name their model
+        return url_for('media', kind=model.__tablename__, id=obj.id, digest=digest)
+    return getattr(obj, 'image', '') or ''
+
+@app.template_global()
+def image_attrs(obj):
+    """Intrinsic size and placeholder attributes for an <img> so layout is reserved before it loads."""
+    attrs = Markup('')
+    if getattr(obj, 'image_width', None) and getattr(obj, 'image_height', None):
+        attrs += Markup('width="{}" height="{}" ').format(obj.image_width, obj.image_height)
+    if getattr(obj, 'image_color', None):
+        style = Markup('background-color: {};').format(obj.image_color)
+        if obj.image_placeholder:
+            style += Markup(" background-image: url('{}'); background-size: cover;").format(obj.image_placeholder)
+        attrs += Markup('style="{}"').format(style)
+    return attrs
+
 # --- Authentication Routes ---
 @app.route('/login', methods=['GET'])
 def login():
@@ -299,51 +671,166 @@ def session_login():
 @app.route('/logout', methods=['POST'])
 def logout():
     print("Logging out user - clearing cookie.")
+    id_token = request.cookies.get(COOKIE_NAME)
+    if id_token:
+        cache.delete('auth', _token_cache_key(id_token))
     response = make_response(jsonify({'status': 'success'}))
     response.set_cookie('token', '', expires=0, httponly=True, secure=True, samesite='Lax')
     return response, 200
 
+# --- Homepage Preloads ---
+TAILWIND_SCRIPT = 'https://cdn.tailwindcss.com'
+FONT_AWESOME_CSS = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css'
+
+def _homepage_state():
+    versions = get_section_versions()
+    return versions, banner_for_preload(versions)
+
+def _preload_url(banner):
+    """URL worth preloading for the banner image (not data: URLs, which are already in the page)."""
+    url = image_src(banner) if banner is not None else ''
+    return url if url.startswith(('/', 'https://', 'http://')) else None
+
+def _add_preload_links(response, preload_image):
+    # Link headers let the browser start these downloads before it parses any HTML; CDNs that support
+    # 103 Early Hints (e.g. Cloudflare) send them ahead of the response. WSGI can't send a 103 itself.
+    links = [f'<{TAILWIND_SCRIPT}>; rel=preload; as=script',
+             f'<{FONT_AWESOME_CSS}>; rel=preload; as=style']
+    if preload_image:
+        links.append(f'<{preload_image}>; rel=preload; as=image; fetchpriority=high')
+    response.headers['Link'] = ', '.join(links)
+    return response
+
 # --- Website Routes ---
 @app.route('/')
 def index():
     # Hard switch: render the site without any DB calls
     if ALLOW_NO_DB:
-        return render_template('index.html', **_static_ctx())
+        return render_template('index.html', sections=render_static_sections(_static_ctx()))
 
     # If DB not configured at all, show maintenance (or static fallback if you prefer)
     if db is None:
         return render_template('maintenance.html'), 503
 
     try:
-        # DB-backed render
-        header = Header.query.first()
-        banner = Banner.query.first()
-        about = About.query.first()
-
-        why_choose = WhyChoose.query.order_by(WhyChoose.order_id).all() if hasattr(WhyChoose, 'order_id') else WhyChoose.query.all()
-        highlights = Highlight.query.order_by(Highlight.order_id).all() if hasattr(Highlight, 'order_id') else Highlight.query.all()
-
-        services_q = Service.query.filter_by(is_additional=False)
-        services = services_q.order_by(Service.order_id).all() if hasattr(Service, 'order_id') else services_q.all()
-
-        additional_services_entry = Service.query.filter_by(is_additional=True).first()
-        additional_services_text = additional_services_entry.additional_services if additional_services_entry else ''
-
-        events = Event.query.order_by(Event.order_id).all() if hasattr(Event, 'order_id') else Event.query.all()
-        team = TeamMember.query.order_by(TeamMember.order_id).all() if hasattr(TeamMember, 'order_id') else TeamMember.query.all()
-        contact = Contact.query.first()
-        footer = Footer.query.first()
-
-        return render_template('index.html',
-                               header=header, banner=banner, about=about,
-                               why_choose=why_choose, highlights=highlights,
-                               services=services, additional_services=additional_services_text,
-                               events=events, team=team, contact=contact, footer=footer)
+        versions, banner = run_on_replica(_homepage_state)
+        preload_image = _preload_url(banner)
+        html = cached_homepage(versions)
+        if html is None:
+            # Not rendered yet for this content version: stream it, so the <head> and its preloads reach
+            # the browser while the sections are still being queried and rendered (only changed ones are).
+            # A section may still fall back after the headers are sent, so the CDN only gets the page once
+            # it is complete and served whole from the page cache.
+            response = _hold_db_slot(keep_private(app.response_class(
+                stream_homepage(versions, _static_ctx, preload_image=preload_image), mimetype='text/html')))
+        else:
+            # Only complete DB-rendered pages go to the CDN; the fallbacks below stay uncached
+            response = cache_homepage(make_response(html), SECTIONS)
+        return _add_preload_links(response, preload_image)
 
     except (OperationalError, SQLAlchemyError, Exception) as e:
         # DB exploded (quota, SSL, etc.) — serve static site instead of 500
         app.logger.error("DB failure on / : %s", e)
-        return render_template('index.html', **_static_ctx())
+        return render_template('index.html', sections=render_static_sections(_static_ctx()))
+
+@app.route('/visit', methods=['POST'])
+def count_visit():
+    """Visit beacon sent by every homepage load, however the page was served (CDN, page cache, service
+    worker); returns the live visit total for the about section."""
+    if db is None or ALLOW_NO_DB:
+        return '', 204
+    count_homepage_visit()  # buffered in process; see counters.py
+    try:
+        clicks = run_on_replica(displayed_clicks) + pending_visits()
+    except SQLAlchemyError as e:
+        app.logger.error("DB failure on /visit : %s", e)
+        return '', 204
+    response = jsonify({"clicks": clicks})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/media/<kind>/<int:id>/<digest>')
+def media(kind, id, digest):
+    """Serve an uploaded image as bytes; the content hash in the URL makes it cacheable forever."""
+    if db is None: abort(404)
+    model = {'banner': Banner, 'highlight': Highlight, 'event': Event, 'team_member': TeamMember}.get(kind)
+    if model is None: abort(404)
+
+    cache_key = f"{kind}:{id}:{digest}"
+    payload = cache.get('image', cache_key)
+    if payload is None:
+        row = repository.image_row(model, id)
+        if row is None or row.image_hash != digest:
+            abort(404)
+        payload = image_payload(row.image, row.image_data, row.image_mime)
+        if payload is None:
+            abort(404)
+        cache.set('image', cache_key, payload, ttl=MEDIA_CACHE_TTL)
+
+    mime, data = payload
+    response = app.response_class(data, mimetype=mime)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    tag_media(response, kind, id)
+    response.set_etag(digest)
+    return response.make_conditional(request)
+
+# --- Offline Support ---
+# Assets every homepage loads; the service worker precaches them along with the page and the banner image
+PRECACHE_ASSETS = ('/', TAILWIND_SCRIPT, FONT_AWESOME_CSS)
+
+def _precache_manifest(versions):
+    """The shell and the banner (LCP) image. Other images are cached by the worker's cache-first route
+    as pages load them, so installing it never downloads the lazy carousel, events or team images."""
+    urls = list(PRECACHE_ASSETS)
+    banner_url = _preload_url(banner_for_preload(versions))
+    if banner_url:
+        urls.append(banner_url)
+    return urls
+
+@app.route('/sw.js')
+def service_worker():
+    """The service worker, with a precache manifest for the current content version."""
+    if db is None or ALLOW_NO_DB:
+        body = render_template('sw.js', version='static', precache=list(PRECACHE_ASSETS))
+        response = app.response_class(body, mimetype='text/javascript')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    try:
+        versions = run_on_replica(get_section_versions)
+        tag = version_tag(versions)
+        body = cache.get_or_set('sw', tag, lambda: render_template(
+            'sw.js', version=tag, precache=run_on_replica(lambda: _precache_manifest(versions))), ttl=API_CACHE_TTL)
+    except SQLAlchemyError as e:
+        # A failed update check keeps the installed worker, which is what we want here
+        app.logger.error("DB failure on /sw.js : %s", e)
+        return app.response_class("// temporarily unavailable", status=503, mimetype='text/javascript')
+    return cache_homepage(app.response_class(body, mimetype='text/javascript'), SECTIONS)
+
+@app.route('/version')
+def get_content_version():
+    """Current content version, polled by the homepage to notice its cached copy is out of date."""
+    if db is None or ALLOW_NO_DB:
+        return jsonify({"version": "static"})
+    try:
+        tag = version_tag(run_on_replica(get_section_versions))
+    except SQLAlchemyError as e:
+        app.logger.error("DB failure on /version : %s", e)
+        return jsonify({"error": "Content version unavailable."}), 503
+    return cache_homepage(jsonify({"version": tag}), SECTIONS)
+
+@app.cli.command('backfill-image-metadata')
+def backfill_image_metadata():
+    """Compute image metadata for rows uploaded before it was recorded."""
+    if db is None:
+        print("Database not configured.")
+        return
+    for model in (Banner, Highlight, Event, TeamMember):
+        missing = or_(model.image_hash.is_(None), model.image_width.is_(None))
+        for obj in db.session.scalars(select(model).where(missing)).all():
+            for column, value in image_metadata(stored_image(obj.image, obj.image_data, obj.image_mime)).items():
+                setattr(obj, column, value)
+            db.session.commit()
+            print(f"Updated image metadata for {obj!r}")
 
 # --- CMS Route ---
 @app.route('/cms')
@@ -351,79 +838,82 @@ def index():
 def cms():
     if db is None:
         return "Database is not configured. CMS is inaccessible.", 500
-    return render_template('cms.html')
+    return render_template('cms.html', image_fields=UPLOAD_LIMITS)
 
 # --- API Endpoints for CMS ---
 @app.route('/api/header', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('header')
 def get_header():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    header = Header.query.first()
-    return jsonify({"logo": header.logo if header else ""})
+    header = repository.first_view(HeaderView)
+    return jsonify({"logo": header.logo if header else "", "version": header.version if header else 0})
 
 @app.route('/api/banner', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('banner')
 def get_banner():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    banner = Banner.query.first()
+    banner = repository.first_view(BannerView, full_image=True)
     return jsonify({
         "title": banner.title if banner else "",
         "subtitle": banner.subtitle if banner else "",
-        "image": banner.image if banner else ""
+        "image": banner.image if banner else "",
+        "version": banner.version if banner else 0
     })
 
 @app.route('/api/about', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('about')
 def get_about():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    about = About.query.first()
+    about = repository.first_view(AboutView)
     return jsonify({
         "description": about.description if about else "",
         "logo": about.logo if about else "",
         "collaborators": about.collaborators if about else 0,
         "students": about.students if about else 0,
         "projects": about.projects if about else 0,
-        "clicks": about.clicks if about else 0
+        "clicks": about.clicks if about else 0,
+        "version": about.version if about else 0
     })
 
 @app.route('/api/why_choose', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('why_choose')
 def get_why_choose():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    why_choose = WhyChoose.query.order_by(WhyChoose.order_id).all() if hasattr(WhyChoose, 'order_id') else WhyChoose.query.all()
-    return jsonify([
-        {"id": wc.id, "title": wc.title, "icon": wc.icon, "description": wc.description, "order_id": getattr(wc, 'order_id', None)}
-        for wc in why_choose
-    ])
+    return _list_response(WhyChoose, ('id', 'title', 'icon', 'description', 'order_id', 'version'))
 
 @app.route('/api/highlight', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('highlights')
 def get_highlights():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    highlights = Highlight.query.order_by(Highlight.order_id).all() if hasattr(Highlight, 'order_id') else Highlight.query.all()
-    return jsonify([
-        {"id": h.id, "image": h.image, "order_id": getattr(h, 'order_id', None)}
-        for h in highlights
-    ])
+    return _list_response(Highlight, ('id', 'image', 'order_id', 'version'))
 
 @app.route('/api/service', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('services')
 def get_services():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    services_query = Service.query.filter_by(is_additional=False)
-    services = services_query.order_by(Service.order_id).all() if hasattr(Service, 'order_id') else services_query.all()
-    return jsonify([
-        {"id": s.id, "title": s.title, "icon": s.icon, "description": s.description, "order_id": getattr(s, 'order_id', None)}
-        for s in services
-    ])
+    return _list_response(Service, ('id', 'title', 'icon', 'description', 'order_id', 'version'), ~Service.is_additional)
 
 @app.route('/api/additional_services', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('services')
 def get_additional_services():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    additional = Service.query.filter_by(is_additional=True).first()
+    additional = repository.first_view(AdditionalServicesView, Service.is_additional)
     if additional:
-        return jsonify({"additional_services": additional.additional_services or ""})
+        return jsonify({"additional_services": additional.additional_services or "", "version": additional.version})
     else:
         try:
             additional = Service(title="Additional Services", icon=None, description=None, additional_services="", is_additional=True)
@@ -440,110 +930,161 @@ def get_additional_services():
 
 @app.route('/api/event', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('events')
 def get_events():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    events = Event.query.order_by(Event.order_id).all() if hasattr(Event, 'order_id') else Event.query.all()
-    return jsonify([
-        {"id": e.id, "title": e.title, "year": e.year, "image": e.image, "order_id": getattr(e, 'order_id', None)}
-        for e in events
-    ])
+    return _list_response(Event, ('id', 'title', 'year', 'image', 'order_id', 'version'))
 
 @app.route('/api/team', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('team')
 def get_team():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    team = TeamMember.query.order_by(TeamMember.order_id).all() if hasattr(TeamMember, 'order_id') else TeamMember.query.all()
-    return jsonify([
-        {"id": t.id, "name": t.name, "title": t.title, "bio": t.bio,
-         "image": t.image, "linkedin": t.linkedin, "github": t.github, "order_id": getattr(t, 'order_id', None)}
-        for t in team
-    ])
+    return _list_response(TeamMember, ('id', 'name', 'title', 'bio', 'image', 'linkedin', 'github', 'order_id', 'version'))
 
 @app.route('/api/contact', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('contact')
 def get_contact():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    contact = Contact.query.first()
+    contact = repository.first_view(ContactView)
     return jsonify({
         "location": contact.location if contact else "",
         "email": contact.email if contact else "",
-        "phone": contact.phone if contact else ""
+        "phone": contact.phone if contact else "",
+        "version": contact.version if contact else 0
     })
 
 @app.route('/api/footer', methods=['GET'])
 @login_required
+@replica_reads
+@cached_section_json('footer')
 def get_footer():
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    footer = Footer.query.first()
+    footer = repository.first_view(FooterView)
     return jsonify({
         "address": footer.address if footer else "",
         "email": footer.email if footer else "",
         "phone": footer.phone if footer else "",
         "linkedin": footer.linkedin if footer else "",
         "github": footer.github if footer else "",
-        "twitter": footer.twitter if footer else ""
+        "twitter": footer.twitter if footer else "",
+        "version": footer.version if footer else 0
     })
 
+def _row_json(row):
+    """A changed row (see repository.changed_since) as a JSON object."""
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in row.items()}
+
+@app.route('/api/jobs/<int:id>', methods=['GET'])
+@login_required
+def get_job(id):
+    """Status of a background job queued by an earlier write (see jobs.py)."""
+    if db is None: return jsonify({"error": "Database not configured."}), 500
+    job = db.session.get(Job, id)
+    if job is None:
+        return jsonify({"message": "Job not found!"}), 404
+    return jsonify({
+        "id": job.id, "kind": job.kind, "status": job.status, "attempts": job.attempts,
+        "result": json.loads(job.result) if job.result else None, "error": job.error,
+        "created_at": job.created_at.isoformat(), "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    })
+
+@app.route('/api/cron/run-jobs', methods=['GET'])
+def cron_run_jobs():
+    """Run due background jobs: the Vercel cron (vercel.json) calls this where JOB_MODE is external.
+    Vercel sends CRON_SECRET as a bearer token; without the variable set the route stays closed."""
+    secret = os.getenv('CRON_SECRET')
+    if not secret or not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {secret}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    if db is None: return jsonify({"error": "Database not configured."}), 500
+    return jsonify({"ran": jobs.run_pending(budget=jobs.JOB_CRON_BUDGET)})
+
+@app.route('/api/changes', methods=['GET'])
+@login_required
+@replica_reads
+def get_changes():
+    """Rows written or deleted after the client's cursor (?since=<seq>), keyed by table name.
+
+    since=0 (or a cursor from another database) returns every row with "reset": true.
+    """
+    if db is None: return jsonify({"error": "Database not configured."}), 500
+    since = request.args.get('since', 0, type=int)
+    seq = repository.change_seq()  # read first: rows committed meanwhile are re-sent next time, never skipped
+    reset = since <= 0 or since > seq
+    if reset:
+        since = 0
+    changed = {}
+    for model in MODEL_SECTIONS:
+        rows = repository.changed_since(model, since)
+        if rows:
+            changed[model.__tablename__] = [_row_json(row) for row in rows]
+    deleted = {}
+    if not reset:
+        for kind, row_id in repository.deleted_since(since):
+            deleted.setdefault(kind, []).append(row_id)
+    return jsonify({"seq": seq, "reset": reset, "changed": changed, "deleted": deleted})
+
 # --- POST/PUT/DELETE Endpoints for CMS ---
-@app.route('/api/header', methods=['POST'])
+@app.route('/api/header', methods=['POST', 'PATCH'])
 @login_required
 def update_header():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    header = Header.query.first()
-    if not header:
-        header = Header(logo=data.get('logo', ''))
-        db.session.add(header)
-    else:
-        header.logo = data.get('logo', header.logo)
-    db.session.commit()
-    return jsonify({"message": "Header updated successfully!"})
+    row, status = _patch_row(Header, data, ('logo',), repository.singleton(Header))
+    if status == 404:
+        row = Header()
+        set_image(row, 'logo', data.get('logo', ''))
+        db.session.add(row)
+        db.session.commit()
+        status = 200
+    return _patch_response(row, status, "Header updated successfully!", "Header not found!")
 
-@app.route('/api/banner', methods=['POST'])
+@app.route('/api/banner', methods=['POST', 'PATCH'])
 @login_required
 def update_banner():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    banner = Banner.query.first()
-    if not banner:
-        banner = Banner(
+    row, status = _patch_row(Banner, data, ('title', 'subtitle', 'image'), repository.singleton(Banner))
+    if status == 404:
+        row = Banner(
             title=data.get('title', ''),
             subtitle=data.get('subtitle', ''),
             image=data.get('image', '')
         )
-        db.session.add(banner)
-    else:
-        banner.title = data.get('title', banner.title)
-        banner.subtitle = data.get('subtitle', banner.subtitle)
-        banner.image = data.get('image', banner.image)
-    db.session.commit()
-    return jsonify({"message": "Banner updated successfully!"})
+        _apply_image(row, data)
+        db.session.add(row)
+        _queue_image_job(row)
+        db.session.commit()
+        status = 200
+    return _patch_response(row, status, "Banner updated successfully!", "Banner not found!")
 
-@app.route('/api/about', methods=['POST'])
+@app.route('/api/about', methods=['POST', 'PATCH'])
 @login_required
 def update_about():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    about = About.query.first()
-    if not about:
-        about = About(
+    # clicks is not editable: the visit counter (counters.py) owns it, and a CMS form loaded before
+    # the latest visits would write back a stale total
+    row, status = _patch_row(About, data, ('description', 'logo', 'collaborators', 'students', 'projects'),
+                             repository.singleton(About))
+    if status == 404:
+        row = About(
             description=data.get('description', ''),
-            logo=data.get('logo', ''),
             collaborators=data.get('collaborators', 0),
             students=data.get('students', 0),
             projects=data.get('projects', 0),
-            clicks=data.get('clicks', 0)
+            clicks=0
         )
-        db.session.add(about)
-    else:
-        about.description = data.get('description', about.description)
-        about.logo = data.get('logo', about.logo)
-        about.collaborators = data.get('collaborators', about.collaborators)
-        about.students = data.get('students', about.students)
-        about.projects = data.get('projects', about.projects)
-        about.clicks = data.get('clicks', about.clicks)
-    db.session.commit()
-    return jsonify({"message": "About Us updated successfully!"})
+        set_image(row, 'logo', data.get('logo', ''))
+        db.session.add(row)
+        db.session.commit()
+        status = 200
+    return _patch_response(row, status, "About Us updated successfully!", "About Us not found!")
 
 @app.route('/api/why_choose', methods=['POST'])
 @login_required
@@ -551,8 +1092,7 @@ def add_why_choose():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
     if hasattr(WhyChoose, 'order_id'):
-        max_order = db.session.query(func.max(WhyChoose.order_id)).scalar() or 0
-        new_order_id = max_order + 1
+        new_order_id = repository.next_order_id(WhyChoose)
     else:
         new_order_id = 0
 
@@ -571,31 +1111,25 @@ def add_why_choose():
         response_data["order_id"] = why_choose.order_id
     return jsonify(response_data), 201
 
-@app.route('/api/why_choose/<int:id>', methods=['PUT'])
+@app.route('/api/why_choose/<int:id>', methods=['PUT', 'PATCH'])
 @login_required
 def update_why_choose(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    why_choose = WhyChoose.query.get(id)
-    if why_choose:
-        why_choose.title = data.get('title', why_choose.title)
-        why_choose.icon = data.get('icon', why_choose.icon)
-        why_choose.description = data.get('description', why_choose.description)
-        db.session.commit()
-        return jsonify({"message": "Why Choose card updated successfully!"})
-    return jsonify({"message": "Card not found!"}), 404
+    row, status = _patch_row(WhyChoose, data, ('title', 'icon', 'description'), WhyChoose.id == id)
+    return _patch_response(row, status, "Why Choose card updated successfully!", "Card not found!")
 
 @app.route('/api/why_choose/<int:id>', methods=['DELETE'])
 @login_required
 def delete_why_choose(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    why_choose = WhyChoose.query.get(id)
+    why_choose = repository.get(WhyChoose, id)
     if why_choose:
         deleted_order_id = getattr(why_choose, 'order_id', None)
         db.session.delete(why_choose)
         db.session.commit()
         if deleted_order_id is not None and hasattr(WhyChoose, 'order_id'):
-            items_to_reorder = WhyChoose.query.filter(WhyChoose.order_id > deleted_order_id).order_by(WhyChoose.order_id).all()
+            items_to_reorder = repository.items_after(WhyChoose, deleted_order_id)
             for item in items_to_reorder:
                 item.order_id -= 1
             db.session.commit()
@@ -610,11 +1144,11 @@ def move_why_choose(id):
         return jsonify({"message": "Ordering is not configured for Why Choose."}), 400
 
     direction = (request.json or {}).get('direction')
-    item_to_move = WhyChoose.query.get(id)
+    item_to_move = repository.get(WhyChoose, id)
     if not item_to_move:
         return jsonify({"message": "Card not found!"}), 404
 
-    all_items = WhyChoose.query.order_by(WhyChoose.order_id).all()
+    all_items = repository.ordered(WhyChoose)
     ids = [i.id for i in all_items]
     try:
         current_index = ids.index(id)
@@ -640,45 +1174,42 @@ def add_highlight():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
     if hasattr(Highlight, 'order_id'):
-        max_order = db.session.query(func.max(Highlight.order_id)).scalar() or 0
-        new_order_id = max_order + 1
+        new_order_id = repository.next_order_id(Highlight)
     else:
         new_order_id = 0
 
     highlight = Highlight(image=data.get('image', ''))
+    _apply_image(highlight, data)
     if hasattr(Highlight, 'order_id'):
         highlight.order_id = new_order_id
 
     db.session.add(highlight)
+    _queue_image_job(highlight)
     db.session.commit()
     response_data = {"message": "Highlight added successfully!", "id": highlight.id}
     if hasattr(highlight, 'order_id'):
         response_data["order_id"] = highlight.order_id
-    return jsonify(response_data), 201
+    return jsonify(_with_queued_jobs(response_data)), 201
 
-@app.route('/api/highlight/<int:id>', methods=['PUT'])
+@app.route('/api/highlight/<int:id>', methods=['PUT', 'PATCH'])
 @login_required
 def update_highlight(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    highlight = Highlight.query.get(id)
-    if highlight:
-        highlight.image = data.get('image', highlight.image)
-        db.session.commit()
-        return jsonify({"message": "Highlight updated successfully!"})
-    return jsonify({"message": "Highlight not found!"}), 404
+    row, status = _patch_row(Highlight, data, ('image',), Highlight.id == id)
+    return _patch_response(row, status, "Highlight updated successfully!", "Highlight not found!")
 
 @app.route('/api/highlight/<int:id>', methods=['DELETE'])
 @login_required
 def delete_highlight(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    highlight = Highlight.query.get(id)
+    highlight = repository.get(Highlight, id)
     if highlight:
         deleted_order_id = getattr(highlight, 'order_id', None)
         db.session.delete(highlight)
         db.session.commit()
         if deleted_order_id is not None and hasattr(Highlight, 'order_id'):
-            items_to_reorder = Highlight.query.filter(Highlight.order_id > deleted_order_id).order_by(Highlight.order_id).all()
+            items_to_reorder = repository.items_after(Highlight, deleted_order_id)
             for item in items_to_reorder:
                 item.order_id -= 1
             db.session.commit()
@@ -693,11 +1224,11 @@ def move_highlight(id):
         return jsonify({"message": "Ordering is not configured for Highlights."}), 400
 
     direction = (request.json or {}).get('direction')
-    item_to_move = Highlight.query.get(id)
+    item_to_move = repository.get(Highlight, id)
     if not item_to_move:
         return jsonify({"message": "Highlight not found!"}), 404
 
-    all_items = Highlight.query.order_by(Highlight.order_id).all()
+    all_items = repository.ordered(Highlight)
     ids = [i.id for i in all_items]
     try:
         current_index = ids.index(id)
@@ -726,8 +1257,7 @@ def add_service():
         return jsonify({"message": "Use the additional services endpoint for that."}), 400
 
     if hasattr(Service, 'order_id'):
-        max_order = db.session.query(func.max(Service.order_id)).filter_by(is_additional=False).scalar() or 0
-        new_order_id = max_order + 1
+        new_order_id = repository.next_order_id(Service)
     else:
         new_order_id = 0
 
@@ -747,31 +1277,26 @@ def add_service():
         response_data["order_id"] = service.order_id
     return jsonify(response_data), 201
 
-@app.route('/api/service/<int:id>', methods=['PUT'])
+@app.route('/api/service/<int:id>', methods=['PUT', 'PATCH'])
 @login_required
 def update_service(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    service = Service.query.get(id)
-    if service and not service.is_additional:
-        service.title = data.get('title', service.title)
-        service.icon = data.get('icon', service.icon)
-        service.description = data.get('description', service.description)
-        db.session.commit()
-        return jsonify({"message": "Service updated successfully!"})
-    return jsonify({"message": "Service not found or is the additional services entry!"}), 404
+    row, status = _patch_row(Service, data, ('title', 'icon', 'description'), Service.id == id, ~Service.is_additional)
+    return _patch_response(row, status, "Service updated successfully!",
+                           "Service not found or is the additional services entry!")
 
 @app.route('/api/service/<int:id>', methods=['DELETE'])
 @login_required
 def delete_service(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    service = Service.query.get(id)
+    service = repository.get(Service, id)
     if service and not service.is_additional:
         deleted_order_id = getattr(service, 'order_id', None)
         db.session.delete(service)
         db.session.commit()
         if deleted_order_id is not None and hasattr(Service, 'order_id'):
-            items_to_reorder = Service.query.filter_by(is_additional=False).filter(Service.order_id > deleted_order_id).order_by(Service.order_id).all()
+            items_to_reorder = repository.items_after(Service, deleted_order_id)
             for item in items_to_reorder:
                 item.order_id -= 1
             db.session.commit()
@@ -786,11 +1311,11 @@ def move_service(id):
         return jsonify({"message": "Ordering is not configured for Services."}), 400
 
     direction = (request.json or {}).get('direction')
-    item_to_move = Service.query.get(id)
+    item_to_move = repository.get(Service, id)
     if not item_to_move or item_to_move.is_additional:
         return jsonify({"message": "Service not found or is the additional services entry!"}), 404
 
-    all_items = Service.query.filter_by(is_additional=False).order_by(Service.order_id).all()
+    all_items = repository.regular_services()
     ids = [i.id for i in all_items]
     try:
         current_index = ids.index(id)
@@ -810,21 +1335,21 @@ def move_service(id):
     db.session.commit()
     return jsonify({'status': 'success', 'message': 'Service moved successfully.'})
 
-@app.route('/api/additional_services', methods=['POST'])
+@app.route('/api/additional_services', methods=['POST', 'PATCH'])
 @login_required
 def update_additional_services():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    additional = Service.query.filter_by(is_additional=True).first()
-    if not additional:
-        additional = Service(title="Additional Services", icon=None, description=None, additional_services=data.get('additional_services', ''), is_additional=True)
+    row, status = _patch_row(Service, data, ('additional_services',),
+                             repository.singleton(Service, Service.is_additional))
+    if status == 404:
+        row = Service(title="Additional Services", icon=None, description=None, additional_services=data.get('additional_services', ''), is_additional=True)
         if hasattr(Service, 'order_id'):
-            additional.order_id = 0
-        db.session.add(additional)
-    else:
-        additional.additional_services = data.get('additional_services', additional.additional_services)
-    db.session.commit()
-    return jsonify({"message": "Additional Services updated successfully!"})
+            row.order_id = 0
+        db.session.add(row)
+        db.session.commit()
+        status = 200
+    return _patch_response(row, status, "Additional Services updated successfully!", "Additional Services not found!")
 
 @app.route('/api/event', methods=['POST'])
 @login_required
@@ -832,8 +1357,7 @@ def add_event():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
     if hasattr(Event, 'order_id'):
-        max_order = db.session.query(func.max(Event.order_id)).scalar() or 0
-        new_order_id = max_order + 1
+        new_order_id = repository.next_order_id(Event)
     else:
         new_order_id = 0
 
@@ -842,41 +1366,37 @@ def add_event():
         year=data.get('year', ''),
         image=data.get('image', '')
     )
+    _apply_image(event, data)
     if hasattr(Event, 'order_id'):
         event.order_id = new_order_id
 
     db.session.add(event)
+    _queue_image_job(event)
     db.session.commit()
     response_data = {"message": "Event added successfully!", "id": event.id}
     if hasattr(event, 'order_id'):
         response_data["order_id"] = event.order_id
-    return jsonify(response_data), 201
+    return jsonify(_with_queued_jobs(response_data)), 201
 
-@app.route('/api/event/<int:id>', methods=['PUT'])
+@app.route('/api/event/<int:id>', methods=['PUT', 'PATCH'])
 @login_required
 def update_event(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    event = Event.query.get(id)
-    if event:
-        event.title = data.get('title', event.title)
-        event.year = data.get('year', event.year)
-        event.image = data.get('image', event.image)
-        db.session.commit()
-        return jsonify({"message": "Event updated successfully!"})
-    return jsonify({"message": "Event not found!"}), 404
+    row, status = _patch_row(Event, data, ('title', 'year', 'image'), Event.id == id)
+    return _patch_response(row, status, "Event updated successfully!", "Event not found!")
 
 @app.route('/api/event/<int:id>', methods=['DELETE'])
 @login_required
 def delete_event(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    event = Event.query.get(id)
+    event = repository.get(Event, id)
     if event:
         deleted_order_id = getattr(event, 'order_id', None)
         db.session.delete(event)
         db.session.commit()
         if deleted_order_id is not None and hasattr(Event, 'order_id'):
-            items_to_reorder = Event.query.filter(Event.order_id > deleted_order_id).order_by(Event.order_id).all()
+            items_to_reorder = repository.items_after(Event, deleted_order_id)
             for item in items_to_reorder:
                 item.order_id -= 1
             db.session.commit()
@@ -891,11 +1411,11 @@ def move_event(id):
         return jsonify({"message": "Ordering is not configured for Events."}), 400
 
     direction = (request.json or {}).get('direction')
-    item_to_move = Event.query.get(id)
+    item_to_move = repository.get(Event, id)
     if not item_to_move:
         return jsonify({"message": "Event not found!"}), 404
 
-    all_items = Event.query.order_by(Event.order_id).all()
+    all_items = repository.ordered(Event)
     ids = [i.id for i in all_items]
     try:
         current_index = ids.index(id)
@@ -921,8 +1441,7 @@ def add_team_member():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
     if hasattr(TeamMember, 'order_id'):
-        max_order = db.session.query(func.max(TeamMember.order_id)).scalar() or 0
-        new_order_id = max_order + 1
+        new_order_id = repository.next_order_id(TeamMember)
     else:
         new_order_id = 0
 
@@ -935,53 +1454,47 @@ def add_team_member():
             linkedin=data.get('linkedin', None),
             github=data.get('github', None)
         )
+        _apply_image(team_member, data)
         if hasattr(TeamMember, 'order_id'):
             team_member.order_id = new_order_id
 
         db.session.add(team_member)
+        _queue_image_job(team_member)
         db.session.commit()
         response_data = {"message": "Team member added successfully!", "id": team_member.id}
         if hasattr(team_member, 'order_id'):
             response_data["order_id"] = team_member.order_id
-        return jsonify(response_data), 201
+        return jsonify(_with_queued_jobs(response_data)), 201
     except Exception as e:
         db.session.rollback()
         print(f"Error in add_team_member: {str(e)}")
         return jsonify({"error": f"Failed to add team member: {str(e)}"}), 500
 
-@app.route('/api/team/<int:id>', methods=['PUT'])
+@app.route('/api/team/<int:id>', methods=['PUT', 'PATCH'])
 @login_required
 def update_team_member(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    team_member = TeamMember.query.get(id)
-    if team_member:
-        try:
-            team_member.name = data.get('name', team_member.name)
-            team_member.title = data.get('title', team_member.title)
-            team_member.bio = data.get('bio', team_member.bio)
-            team_member.image = data.get('image', team_member.image)
-            team_member.linkedin = data.get('linkedin', team_member.linkedin)
-            team_member.github = data.get('github', team_member.github)
-            db.session.commit()
-            return jsonify({"message": "Team member updated successfully!"})
-        except Exception as e:
-            db.session.rollback()
-            print(f"Error in update_team_member for ID {id}: {str(e)}")
-            return jsonify({"error": f"Failed to update team member: {str(e)}"}), 500
-    return jsonify({"message": "Team member not found!"}), 404
+    try:
+        row, status = _patch_row(TeamMember, data, ('name', 'title', 'bio', 'image', 'linkedin', 'github'),
+                                 TeamMember.id == id)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in update_team_member for ID {id}: {str(e)}")
+        return jsonify({"error": f"Failed to update team member: {str(e)}"}), 500
+    return _patch_response(row, status, "Team member updated successfully!", "Team member not found!")
 
 @app.route('/api/team/<int:id>', methods=['DELETE'])
 @login_required
 def delete_team_member(id):
     if db is None: return jsonify({"error": "Database not configured."}), 500
-    team_member = TeamMember.query.get(id)
+    team_member = repository.get(TeamMember, id)
     if team_member:
         deleted_order_id = getattr(team_member, 'order_id', None)
         db.session.delete(team_member)
         db.session.commit()
         if deleted_order_id is not None and hasattr(TeamMember, 'order_id'):
-            items_to_reorder = TeamMember.query.filter(TeamMember.order_id > deleted_order_id).order_by(TeamMember.order_id).all()
+            items_to_reorder = repository.items_after(TeamMember, deleted_order_id)
             for item in items_to_reorder:
                 item.order_id -= 1
             db.session.commit()
@@ -996,11 +1509,11 @@ def move_team_member(id):
         return jsonify({"message": "Ordering is not configured for Team Members."}), 400
 
     direction = (request.json or {}).get('direction')
-    item_to_move = TeamMember.query.get(id)
+    item_to_move = repository.get(TeamMember, id)
     if not item_to_move:
         return jsonify({"message": "Team member not found!"}), 404
 
-    all_items = TeamMember.query.order_by(TeamMember.order_id).all()
+    all_items = repository.ordered(TeamMember)
     ids = [i.id for i in all_items]
     try:
         current_index = ids.index(id)
@@ -1020,34 +1533,32 @@ def move_team_member(id):
     db.session.commit()
     return jsonify({'status': 'success', 'message': 'Team member moved successfully.'})
 
-@app.route('/api/contact', methods=['POST'])
+@app.route('/api/contact', methods=['POST', 'PATCH'])
 @login_required
 def update_contact():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    contact = Contact.query.first()
-    if not contact:
-        contact = Contact(
+    row, status = _patch_row(Contact, data, ('location', 'email', 'phone'), repository.singleton(Contact))
+    if status == 404:
+        row = Contact(
             location=data.get('location', ''),
             email=data.get('email', ''),
             phone=data.get('phone', '')
         )
-        db.session.add(contact)
-    else:
-        contact.location = data.get('location', contact.location)
-        contact.email = data.get('email', contact.email)
-        contact.phone = data.get('phone', contact.phone)
-    db.session.commit()
-    return jsonify({"message": "Contact updated successfully!"})
+        db.session.add(row)
+        db.session.commit()
+        status = 200
+    return _patch_response(row, status, "Contact updated successfully!", "Contact not found!")
 
-@app.route('/api/footer', methods=['POST'])
+@app.route('/api/footer', methods=['POST', 'PATCH'])
 @login_required
 def update_footer():
     if db is None: return jsonify({"error": "Database not configured."}), 500
     data = request.json or {}
-    footer = Footer.query.first()
-    if not footer:
-        footer = Footer(
+    row, status = _patch_row(Footer, data, ('address', 'email', 'phone', 'linkedin', 'github', 'twitter'),
+                             repository.singleton(Footer))
+    if status == 404:
+        row = Footer(
             address=data.get('address', ''),
             email=data.get('email', ''),
             phone=data.get('phone', ''),
@@ -1055,16 +1566,10 @@ def update_footer():
             github=data.get('github', None),
             twitter=data.get('twitter', None)
         )
-        db.session.add(footer)
-    else:
-        footer.address = data.get('address', footer.address)
-        footer.email = data.get('email', footer.email)
-        footer.phone = data.get('phone', footer.phone)
-        footer.linkedin = data.get('linkedin', footer.linkedin)
-        footer.github = data.get('github', footer.github)
-        footer.twitter = data.get('twitter', footer.twitter)
-    db.session.commit()
-    return jsonify({"message": "Footer updated successfully!"})
+        db.session.add(row)
+        db.session.commit()
+        status = 200
+    return _patch_response(row, status, "Footer updated successfully!", "Footer not found!")
 
 # --- Local Development Server ---
 if __name__ == '__main__':
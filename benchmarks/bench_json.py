@@ -0,0 +1,77 @@
+# benchmarks/bench_json.py
+# Serializing a CMS list payload (team members with base64 images): Flask's stdlib provider vs.
+# FastJSONProvider (orjson) vs. the chunked row encoder used by the streamed list endpoints.
+# Needs no database:  python benchmarks/bench_json.py
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import fastjson
+from fastjson import FastJSONProvider
+
+ROWS = int(os.getenv('BENCH_ROWS', '200'))
+IMAGE_KB = int(os.getenv('BENCH_IMAGE_KB', '100'))
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', '20'))
+
+
+def payload():
+    image = 'data:image/jpeg;base64,' + 'QUJD' * (IMAGE_KB * 256)
+    return [{"id": i, "name": f"Member {i}", "title": "Engineer", "bio": "Builds things. " * 20,
+             "image": image, "linkedin": "https://linkedin.com/in/x", "github": None,
+             "order_id": i, "version": 1} for i in range(1, ROWS + 1)]
+
+
+def stdlib_body(app, rows):
+    with app.app_context():
+        return DefaultJSONProvider(app).response(rows).get_data()
+
+
+def fast_body(app, rows):
+    with app.app_context():
+        return FastJSONProvider(app).response(rows).get_data()
+
+
+def streamed_body(app, rows):
+    provider = FastJSONProvider(app)
+    size = 1
+    for i, row in enumerate(rows):
+        size += i > 0
+        for chunk in provider.encode_row(row):
+            size += len(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+    return size + 1
+
+
+def measure(fn, app, rows):
+    fn(app, rows)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(app, rows)
+    elapsed = (time.perf_counter() - start) / ITERATIONS
+    tracemalloc.start()
+    fn(app, rows)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    app = Flask(__name__)
+    rows = payload()
+    print(f"rows: {ROWS}, image size: {IMAGE_KB} KB, orjson: {'yes' if fastjson.orjson else 'no'}")
+    baseline = None
+    for label, fn in (("stdlib jsonify   ", stdlib_body),
+                      ("FastJSONProvider ", fast_body),
+                      ("streamed encoder ", streamed_body)):
+        elapsed, peak = measure(fn, app, rows)
+        baseline = baseline or elapsed
+        print(f"{label}: {elapsed * 1000:7.1f} ms ({baseline / elapsed:4.1f}x), peak {peak / 1048576:6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
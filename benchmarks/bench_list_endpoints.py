@@ -0,0 +1,95 @@
+# benchmarks/bench_list_endpoints.py
+# Time-to-first-byte, total time and peak Python memory of a CMS list endpoint body: the old
+# build-every-dict-then-jsonify path vs. the streamed keyset path (_list_response in app.py).
+# Runs against a throwaway SQLite file:  python benchmarks/bench_list_endpoints.py
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench_list_endpoints.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['INSTANCE_CONNECTION_NAME'] = ''
+# A CONTENT_FILE (or ALLOW_NO_DB's default one) would take precedence over DATABASE_URL, and seed()
+# drops every table: set both explicitly, so .env can't bring them back either
+os.environ['CONTENT_FILE'] = ''
+os.environ['ALLOW_NO_DB'] = '0'
+
+from flask import jsonify
+
+import app as site
+from extensions import db
+from models import TeamMember
+import repository
+
+ROWS = int(os.getenv('BENCH_ROWS', '300'))
+IMAGE_KB = int(os.getenv('BENCH_IMAGE_KB', '100'))
+FIELDS = ('id', 'name', 'title', 'bio', 'image', 'linkedin', 'github', 'order_id', 'version')
+
+
+def legacy_body():
+    team = repository.ordered(TeamMember)
+    response = jsonify([
+        {"id": t.id, "name": t.name, "title": t.title, "bio": t.bio,
+         "image": t.image, "linkedin": t.linkedin, "github": t.github, "order_id": t.order_id, "version": t.version}
+        for t in team
+    ])
+    return iter([response.get_data()])
+
+
+def streamed_body():
+    response = site._list_response(TeamMember, FIELDS)
+    try:
+        yield from response.response
+    finally:
+        response.close()
+
+
+def measure(make_body, query_string=''):
+    """(seconds to first chunk, seconds to last chunk, peak traced bytes, body bytes)."""
+    with site.app.test_request_context('/api/team' + query_string):
+        db.session.remove()
+        tracemalloc.start()
+        start = time.perf_counter()
+        chunks = make_body()
+        size = len(next(chunks))
+        first = time.perf_counter() - start
+        for chunk in chunks:
+            size += len(chunk)
+        total = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        db.session.remove()
+    return first, total, peak, size
+
+
+def seed():
+    assert db.engine.url.database == DB_PATH, f"refusing to drop tables in {db.engine.url}"
+    db.drop_all()
+    db.create_all()
+    image = 'data:image/jpeg;base64,' + 'A' * (IMAGE_KB * 1024)
+    db.session.add_all(TeamMember(name=f'n{i}', title='t', bio='b', image=image, order_id=i) for i in range(1, ROWS + 1))
+    db.session.commit()
+
+
+def main():
+    with site.app.app_context():
+        seed()
+    print(f"rows: {ROWS}, image size: {IMAGE_KB} KB")
+    for label, make_body, query_string in (
+        ("jsonify (all rows)   ", legacy_body, ''),
+        ("streamed (all rows)  ", streamed_body, ''),
+        ("streamed (limit=50)  ", streamed_body, '?limit=50'),
+        ("streamed (no images) ", streamed_body, '?fields=name,title'),
+    ):
+        first, total, peak, size = measure(make_body, query_string)
+        print(f"{label}: first byte {first * 1000:7.1f} ms, total {total * 1000:7.1f} ms, "
+              f"peak {peak / 1048576:7.1f} MB, body {size / 1048576:6.1f} MB")
+    os.remove(DB_PATH)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_overload.py
+# Homepage latency under overload with and without admission control. The database is simulated
+# as a single connection (the Cloud SQL connector's pool_size=1) that is held for DB_MS per render,
+# and CLIENTS threads request / at once. Reports p50/p99/max latency and how many were shed.
+# Runs against a throwaway SQLite file:  python benchmarks/bench_overload.py
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench_overload.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['INSTANCE_CONNECTION_NAME'] = ''
+# A CONTENT_FILE (or ALLOW_NO_DB's default one) would take precedence over DATABASE_URL, and seed()
+# drops every table: set both explicitly, so .env can't bring them back either
+os.environ['CONTENT_FILE'] = ''
+os.environ['ALLOW_NO_DB'] = '0'
+
+import app as site
+from admission import AdmissionController
+from extensions import db
+
+CLIENTS = int(os.getenv('BENCH_CLIENTS', '32'))
+REQUESTS = int(os.getenv('BENCH_REQUESTS', '10'))  # per client
+DB_MS = float(os.getenv('BENCH_DB_MS', '20'))
+
+_connection = threading.Lock()
+_real_versions = site.get_section_versions
+
+
+def _one_connection_versions():
+    with _connection:
+        time.sleep(DB_MS / 1000)
+        return _real_versions()
+
+
+def run(limit):
+    site.admission = AdmissionController(limit, limit * 4)
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        c = site.app.test_client()
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            response = c.get('/')
+            response.get_data()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return pick(0.5), pick(0.99), latencies[-1] * 1000, site.admission.stats()['shed']
+
+
+def main():
+    with site.app.app_context():
+        assert db.engine.url.database == DB_PATH, f"refusing to drop tables in {db.engine.url}"
+        db.drop_all()
+        db.create_all()
+    site.get_section_versions = _one_connection_versions
+    site.app.test_client().get('/').get_data()  # first render becomes the snapshot
+    print(f"clients: {CLIENTS}, requests each: {REQUESTS}, simulated DB time: {DB_MS:.0f} ms on one connection")
+    for label, limit in (("no admission control", 10_000), ("admission limit 1   ", 1)):
+        p50, p99, worst, shed = run(limit)
+        print(f"{label}: p50 {p50:7.1f} ms, p99 {p99:7.1f} ms, max {worst:7.1f} ms, "
+              f"shed to snapshot {shed}/{CLIENTS * REQUESTS}")
+    os.remove(DB_PATH)
+
+
+if __name__ == '__main__':
+    main()
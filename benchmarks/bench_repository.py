@@ -0,0 +1,80 @@
+# benchmarks/bench_repository.py
+# Per-call CPU of the legacy Query API vs. repository.py on the homepage / list-endpoint reads.
+# Runs against in-memory SQLite so it needs no database:  python benchmarks/bench_repository.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from dto import HeaderView, AdditionalServicesView
+from extensions import db
+from models import Header, WhyChoose, Highlight, Service, Event, TeamMember
+import repository
+
+ROWS = int(os.getenv('BENCH_ROWS', '20'))
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', '2000'))
+
+
+def legacy_reads():
+    Header.query.first()
+    WhyChoose.query.order_by(WhyChoose.order_id).all()
+    Highlight.query.order_by(Highlight.order_id).all()
+    Service.query.filter_by(is_additional=False).order_by(Service.order_id).all()
+    Service.query.filter_by(is_additional=True).first()
+    Event.query.order_by(Event.order_id).all()
+    TeamMember.query.order_by(TeamMember.order_id).all()
+    TeamMember.query.get(1)
+
+
+def repository_reads():
+    repository.first_view(HeaderView)
+    repository.ordered(WhyChoose)
+    repository.ordered(Highlight)
+    repository.regular_services()
+    repository.first_view(AdditionalServicesView, Service.is_additional)
+    repository.ordered(Event)
+    repository.ordered(TeamMember)
+    repository.get(TeamMember, 1)
+
+
+def seed():
+    db.session.add(Header(logo='Brainycube'))
+    db.session.add(Service(title='Additional Services', is_additional=True, additional_services='', order_id=0))
+    for i in range(1, ROWS + 1):
+        db.session.add(WhyChoose(title=f'w{i}', icon='fa-x', description='d', order_id=i))
+        db.session.add(Highlight(image='', order_id=i))
+        db.session.add(Service(title=f's{i}', icon='fa-x', description='d', is_additional=False, order_id=i))
+        db.session.add(Event(title=f'e{i}', year='2024', image='', order_id=i))
+        db.session.add(TeamMember(name=f't{i}', title='t', bio='b', image='', order_id=i))
+    db.session.commit()
+
+
+def bench(fn):
+    fn()  # warm the compiled-statement cache
+    db.session.remove()
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        fn()
+        db.session.remove()  # one session per request, as in the app
+    return (time.process_time() - start) / ITERATIONS * 1e6
+
+
+def main():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        seed()
+        legacy = bench(legacy_reads)
+        current = bench(repository_reads)
+    print(f"rows per collection: {ROWS}, iterations: {ITERATIONS}")
+    print(f"legacy Query API : {legacy:8.1f} us CPU per request")
+    print(f"repository       : {current:8.1f} us CPU per request ({(1 - current / legacy) * 100:+.1f}% saved)")
+
+
+if __name__ == '__main__':
+    main()
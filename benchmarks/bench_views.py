@@ -0,0 +1,154 @@
+# benchmarks/bench_views.py
+# Homepage section load + render: ORM instances (the previous loaders) vs. dto view objects
+# (fragments.SECTION_LOADERS). Reports time per render and Python memory per request.
+# Runs against a throwaway SQLite file:  python benchmarks/bench_views.py
+# Timing is noisy at this scale: both variants are warmed up, then timed in alternating rounds
+# (so drift in machine load hits both alike) and compared by the median of the per-round ratios.
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DB_PATH = os.path.join(tempfile.gettempdir(), 'bench_views.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+os.environ['INSTANCE_CONNECTION_NAME'] = ''
+# A CONTENT_FILE (or ALLOW_NO_DB's default one) would take precedence over DATABASE_URL, and seed()
+# drops every table: set both explicitly, so .env can't bring them back either
+os.environ['CONTENT_FILE'] = ''
+os.environ['ALLOW_NO_DB'] = '0'
+
+from sqlalchemy import select
+from sqlalchemy.orm import defer
+
+import app as site
+from extensions import db
+from models import Header, Banner, About, WhyChoose, Highlight, Service, Event, TeamMember, Contact, Footer
+import fragments
+import repository
+
+ROWS = int(os.getenv('BENCH_ROWS', '30'))
+ITERATIONS = int(os.getenv('BENCH_ITERATIONS', '50'))  # renders per timed round
+ROUNDS = int(os.getenv('BENCH_ROUNDS', '21'))
+WARMUP = int(os.getenv('BENCH_WARMUP', '50'))
+IMAGE = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk'
+         '+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+
+
+def _orm_first(model, *options):
+    return db.session.scalars(select(model).options(*options).limit(1)).first()
+
+
+def _orm_ordered(model, *options):
+    return db.session.scalars(select(model).options(*options).order_by(model.order_id)).all()
+
+
+def _without_image(model):
+    return defer(model.image), defer(model.image_data)
+
+
+def _orm_services():
+    additional = db.session.scalars(select(Service).where(Service.is_additional).limit(1)).first()
+    return {"services": repository.regular_services(),
+            "additional_services": additional.additional_services if additional else ''}
+
+
+# The previous loaders: whole ORM instances (images deferred)
+ORM_LOADERS = {
+    'header': lambda: {"header": _orm_first(Header)},
+    'banner': lambda: {"banner": _orm_first(Banner, *_without_image(Banner))},
+    'about': lambda: {"about": _orm_first(About)},
+    'why_choose': lambda: {"why_choose": _orm_ordered(WhyChoose)},
+    'highlights': lambda: {"highlights": _orm_ordered(Highlight, *_without_image(Highlight))},
+    'services': _orm_services,
+    'events': lambda: {"events": _orm_ordered(Event, *_without_image(Event))},
+    'team': lambda: {"team": _orm_ordered(TeamMember, *_without_image(TeamMember))},
+    'contact': lambda: {"contact": _orm_first(Contact)},
+    'footer': lambda: {"footer": _orm_first(Footer)},
+}
+
+
+def render_all(loaders):
+    return [fragments.render_section(name, loaders[name]()) for name in fragments.SECTIONS]
+
+
+def _time_round(loaders, iterations):
+    """ms per render over one round of `iterations` renders."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render_all(loaders)
+        db.session.remove()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def measure_memory(loaders):
+    """(peak KB during one request, KB still allocated when rendering finishes)."""
+    tracemalloc.start()
+    html = render_all(loaders)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del html
+    db.session.remove()
+    return peak / 1024, retained / 1024
+
+
+def measure(variants):
+    """{label: (median ms per render, [ms per round], peak KB, retained KB)}, timed in alternating rounds."""
+    timings = {label: [] for label in variants}
+    with site.app.test_request_context('/'):
+        for loaders in variants.values():
+            _time_round(loaders, WARMUP)  # templates, compiled statements, allocator arenas
+        order = list(variants)
+        for _ in range(ROUNDS):
+            for label in order:
+                timings[label].append(_time_round(variants[label], ITERATIONS))
+            order.reverse()
+        return {label: (statistics.median(timings[label]), timings[label], *measure_memory(loaders))
+                for label, loaders in variants.items()}
+
+
+def seed():
+    assert db.engine.url.database == DB_PATH, f"refusing to drop tables in {db.engine.url}"
+    db.drop_all()
+    db.create_all()
+    db.session.add_all([
+        Header(logo='Brainycube'),
+        Banner(title='T', subtitle='S', image=IMAGE, image_hash='0123456789abcdef', image_width=1, image_height=1),
+        About(description='D', logo='L', collaborators=1, students=2, projects=3, clicks=4),
+        Service(title='Additional Services', is_additional=True, additional_services='More', order_id=0),
+        Contact(location='L', email='e', phone='p'),
+        Footer(address='A', email='e', phone='p'),
+    ])
+    for i in range(1, ROWS + 1):
+        meta = dict(image_hash=f'{i:016x}', image_width=640, image_height=480, image_color='#808080')
+        db.session.add_all([
+            WhyChoose(title=f'w{i}', icon='fa-x', description='d' * 200, order_id=i),
+            Highlight(image=IMAGE, order_id=i, **meta),
+            Service(title=f's{i}', icon='fa-x', description='d' * 200, is_additional=False, order_id=i),
+            Event(title=f'e{i}', year='2024', image=IMAGE, order_id=i, **meta),
+            TeamMember(name=f't{i}', title='t', bio='b' * 300, image=IMAGE, order_id=i, **meta),
+        ])
+    db.session.commit()
+
+
+def main():
+    with site.app.app_context():
+        seed()
+    print(f"rows per collection: {ROWS}, {ROUNDS} rounds of {ITERATIONS} renders after {WARMUP} warm-up renders")
+    results = measure({"ORM instances": ORM_LOADERS, "dto views    ": fragments.SECTION_LOADERS})
+    for label, (ms, rounds, peak, retained) in results.items():
+        print(f"{label}: {ms:6.2f} ms per render (rounds {min(rounds):.2f}-{max(rounds):.2f}), "
+              f"peak {peak:7.1f} KB, held after render {retained:7.1f} KB")
+    orm, views = results.values()
+    # Each round times both variants back to back, so their ratio within a round is what stays stable
+    ratio = statistics.median(v / o for o, v in zip(orm[1], views[1]))
+    print(f"saved: {(1 - ratio) * 100:.0f}% time (median of per-round ratios), "
+          f"{(1 - views[2] / orm[2]) * 100:.0f}% peak memory")
+    os.remove(DB_PATH)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,422 @@
+# cache.py
+import hashlib
+import os
+import pickle
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+# --- Backends ---
+# Every backend stores raw bytes under string keys; serialization and namespacing live in Cache.
+class CacheBackend:
+    name = 'base'
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def get_with_ttl(self, key):
+        """(value, seconds left or None when it never expires); (None, None) on a miss."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class MemoryCache(CacheBackend):
+    """Thread-safe in-process LRU bounded by total value bytes."""
+    name = 'memory'
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] < now:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1] - now if entry[1] is not None else None
+
+    def set(self, key, value, ttl=None):
+        if len(value) > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def incr(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            value = int(entry[0]) + 1 if entry else 1
+            self._remove(key)
+            raw = str(value).encode()
+            self._entries[key] = (raw, None)
+            self.size += len(raw)
+            return value
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+class FileSystemCache(CacheBackend):
+    """One file per key under a directory (e.g. /tmp), pruned oldest-first above max_bytes."""
+    name = 'filesystem'
+    _HEADER = struct.Struct('>d')  # absolute expiry timestamp, 0 = never
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(e.stat().st_size for e in os.scandir(directory) if e.is_file())
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None, None
+        (expires_at,) = self._HEADER.unpack_from(data)
+        now = time.time()
+        if expires_at and expires_at < now:
+            self.delete(key)
+            self.misses += 1
+            return None, None
+        self.hits += 1
+        return data[self._HEADER.size:], expires_at - now if expires_at else None
+
+    def set(self, key, value, ttl=None):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self._HEADER.pack(time.time() + ttl if ttl else 0))
+                f.write(value)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)  # atomic, so readers never see a partial file
+        except OSError as e:
+            print(f"Warning: filesystem cache write failed: {e}")
+            return
+        with self._lock:
+            self.size += self._HEADER.size + len(value) - old_size
+            if self.size > self.max_bytes:
+                self._prune()
+
+    def delete(self, key):
+        path = self._path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self.size -= size
+
+    def incr(self, key):
+        with self._lock:
+            raw = self.get(key)
+            value = int(raw) + 1 if raw else 1
+        self.set(key, str(value).encode())
+        return value
+
+    def _prune(self):
+        entries = sorted((e for e in os.scandir(self.directory) if e.is_file()), key=lambda e: e.stat().st_mtime)
+        target = self.max_bytes * 0.8
+        for entry in entries:
+            if self.size <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.size -= size
+            except OSError:
+                continue
+
+    def stats(self):
+        return {"bytes": self.size, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+
+class RedisCache(CacheBackend):
+    """Minimal RESP2 client (GET/PTTL/SET PX/DEL/INCR) for Redis or any Redis-protocol server.
+
+    Network errors are treated as misses so an unreachable cache never breaks a request,
+    and the server is left alone for `retry_after` seconds before reconnecting.
+    """
+    name = 'redis'
+
+    def __init__(self, url, timeout=0.5, retry_after=5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        self.hits = self.misses = self.errors = 0
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock, self._reader = sock, sock.makefile('rb')
+        if self.password:
+            self._call_unlocked('AUTH', self.password)
+        if self.db:
+            self._call_unlocked('SELECT', self.db)
+
+    def _close(self):
+        for closable in (self._reader, self._sock):
+            try:
+                if closable is not None:
+                    closable.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _call_unlocked(self, *args):
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            raise RuntimeError(rest.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            return [self._read_reply() for _ in range(int(rest))]
+        raise ConnectionError(f"Unexpected reply from cache server: {line!r}")
+
+    def _pipeline(self, *commands):
+        """Send the commands in one round trip; their replies, or None when the server is unreachable."""
+        with self._lock:
+            if self._sock is None and time.monotonic() < self._down_until:
+                return None
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(b''.join(self._encode(args) for args in commands))
+                return [self._read_reply() for _ in commands]
+            except (OSError, ConnectionError, RuntimeError, ValueError) as e:
+                self.errors += 1
+                print(f"Warning: redis cache call {commands[0][0]} failed: {e}")
+                self._close()
+                self._down_until = time.monotonic() + self.retry_after
+                return None
+
+    def _call(self, *args):
+        replies = self._pipeline(args)
+        return replies[0] if replies else None
+
+    def get(self, key):
+        value = self._call('GET', key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_with_ttl(self, key):
+        replies = self._pipeline(('GET', key), ('PTTL', key))
+        if not replies or replies[0] is None or replies[1] == -2:  # -2: expired right after the GET
+            self.misses += 1
+            return None, None
+        self.hits += 1
+        value, pttl = replies
+        return value, pttl / 1000 if pttl >= 0 else None  # -1: no expiry
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._call('SET', key, value, 'PX', int(ttl * 1000))
+        else:
+            self._call('SET', key, value)
+
+    def delete(self, key):
+        self._call('DEL', key)
+
+    def incr(self, key):
+        return self._call('INCR', key)
+
+    def stats(self):
+        return {"host": f"{self.host}:{self.port}", "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+# --- Tiered, Namespaced Front ---
+class Cache:
+    """Pickling, namespaced front over an ordered list of backends (fastest first).
+
+    Reads fall through the tiers and backfill the faster ones on a hit, with the entry's remaining
+    TTL so a backfilled copy never outlives the original; writes go to every tier.
+    Each namespace carries a generation number stored in the slowest (most shared) tier, so
+    invalidate(namespace) drops every key in it at once across instances.
+    """
+
+    def __init__(self, backends, prefix='bc', generation_ttl=2.0):
+        self.backends = backends
+        self.prefix = prefix
+        self.generation_ttl = generation_ttl
+        self._generations = {}  # namespace -> (generation, checked_at)
+        self._lock = threading.Lock()
+
+    def _generation(self, namespace):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._generations.get(namespace)
+            if cached and now - cached[1] < self.generation_ttl:
+                return cached[0]
+        raw = self.backends[-1].get(f"{self.prefix}:gen:{namespace}") if self.backends else None
+        generation = int(raw) if raw else 0
+        with self._lock:
+            self._generations[namespace] = (generation, now)
+        return generation
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}:{namespace}:{self._generation(namespace)}:{key}"
+
+    def get(self, namespace, key, default=None):
+        full_key = self._key(namespace, key)
+        for i, backend in enumerate(self.backends):
+            if i == 0:
+                raw, ttl = backend.get(full_key), None
+            else:
+                raw, ttl = backend.get_with_ttl(full_key)
+            if raw is not None:
+                if ttl is None or ttl > 0:  # (a ttl of 0 would mean "never expires" to the backends)
+                    for faster in self.backends[:i]:
+                        faster.set(full_key, raw, ttl)
+                try:
+                    return pickle.loads(raw)
+                except Exception:
+                    backend.delete(full_key)
+                    return default
+        return default
+
+    def set(self, namespace, key, value, ttl=None):
+        full_key = self._key(namespace, key)
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        for backend in self.backends:
+            backend.set(full_key, raw, ttl)
+
+    def delete(self, namespace, key):
+        full_key = self._key(namespace, key)
+        for backend in self.backends:
+            backend.delete(full_key)
+
+    def invalidate(self, namespace):
+        """Drop every key in a namespace by moving it to a new generation."""
+        generation = self.backends[-1].incr(f"{self.prefix}:gen:{namespace}") if self.backends else None
+        with self._lock:
+            self._generations[namespace] = (generation or 0, time.monotonic())
+
+    def get_or_set(self, namespace, key, fn, ttl=None):
+        value = self.get(namespace, key)
+        if value is None:
+            value = fn()
+            self.set(namespace, key, value, ttl)
+        return value
+
+    def stats(self):
+        return {backend.name: backend.stats() for backend in self.backends}
+
+
+def create_cache_from_env():
+    """Build the app cache from CACHE_TIERS (comma list of memory, filesystem, redis)."""
+    tiers = [t.strip() for t in os.getenv('CACHE_TIERS', 'memory,filesystem').split(',') if t.strip()]
+    redis_url = os.getenv('CACHE_REDIS_URL')
+    if redis_url and 'redis' not in tiers:
+        tiers.append('redis')
+
+    backends = []
+    for tier in tiers:
+        try:
+            if tier == 'memory':
+                backends.append(MemoryCache(int(os.getenv('CACHE_MEMORY_MAX_BYTES', str(32 * 1024 * 1024)))))
+            elif tier == 'filesystem':
+                backends.append(FileSystemCache(os.getenv('CACHE_DIR', '/tmp/app_cache'),
+                                                int(os.getenv('CACHE_FS_MAX_BYTES', str(256 * 1024 * 1024)))))
+            elif tier == 'redis':
+                if not redis_url:
+                    print("Warning: 'redis' cache tier requested but CACHE_REDIS_URL is not set.")
+                    continue
+                backends.append(RedisCache(redis_url))
+            else:
+                print(f"Warning: unknown cache tier '{tier}' ignored.")
+        except OSError as e:
+            print(f"Warning: cache tier '{tier}' disabled: {e}")
+    print(f"Cache tiers: {[b.name for b in backends]}")
+    return Cache(backends)
+
+
+cache = create_cache_from_env()
@@ -0,0 +1,155 @@
+# cdn.py
+import atexit
+import json
+import os
+import threading
+import time
+import urllib.request
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Shared-cache (CDN) lifetime of the homepage; edits purge it sooner through the webhook below
+HOMEPAGE_S_MAXAGE = int(os.getenv('HOMEPAGE_S_MAXAGE', '300'))
+# How long the CDN may keep serving a stale homepage while it revalidates, or while the origin errors
+HOMEPAGE_STALE_WHILE_REVALIDATE = int(os.getenv('HOMEPAGE_STALE_WHILE_REVALIDATE', '86400'))
+HOMEPAGE_STALE_IF_ERROR = int(os.getenv('HOMEPAGE_STALE_IF_ERROR', '86400'))
+
+# POSTed {"surrogate_keys": [...]} after CMS writes; unset disables purging
+PURGE_WEBHOOK_URL = os.getenv('PURGE_WEBHOOK_URL')
+PURGE_WEBHOOK_TOKEN = os.getenv('PURGE_WEBHOOK_TOKEN')
+# Writes within this many seconds are purged in one call; 0 purges inline when the write commits
+# (use 0 where background threads are frozen between requests, e.g. serverless functions)
+PURGE_DEBOUNCE = float(os.getenv('PURGE_DEBOUNCE', '2'))
+PURGE_TIMEOUT = float(os.getenv('PURGE_TIMEOUT', '3'))
+# Attempts per batch of keys; inline retries (PURGE_DEBOUNCE=0) wait PURGE_RETRY_BACKOFF, 2x, ... between them
+PURGE_RETRIES = 3
+PURGE_RETRY_BACKOFF = float(os.getenv('PURGE_RETRY_BACKOFF', '0.25'))
+
+HOMEPAGE_KEY = 'homepage'
+
+
+def section_key(section):
+    return f'section-{section}'
+
+
+# --- Response Policies ---
+def _set_surrogate_keys(response, keys):
+    # Surrogate-Key (Fastly and others) is space separated, Cache-Tag (Cloudflare and others) comma separated
+    response.headers['Surrogate-Key'] = ' '.join(keys)
+    response.headers['Cache-Tag'] = ','.join(keys)
+
+
+def cache_homepage(response, sections):
+    """Let shared caches keep a DB-rendered homepage, tagged with every section it shows."""
+    response.headers['Cache-Control'] = (
+        f'public, max-age=0, s-maxage={HOMEPAGE_S_MAXAGE}, '
+        f'stale-while-revalidate={HOMEPAGE_STALE_WHILE_REVALIDATE}, stale-if-error={HOMEPAGE_STALE_IF_ERROR}'
+    )
+    _set_surrogate_keys(response, [HOMEPAGE_KEY] + [section_key(section) for section in sections])
+    return response
+
+
+def keep_private(response):
+    """Keep a response out of shared caches, e.g. a streamed homepage whose headers go out before it is
+    known whether every section rendered (a failed one falls back to its static version)."""
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+
+def media_key(kind, id):
+    return f'media-{kind}-{id}'
+
+
+def tag_media(response, kind, id):
+    """Tag a media response so deleting its row can purge it (its URL changes whenever the image does)."""
+    _set_surrogate_keys(response, ['media', media_key(kind, id)])
+    return response
+
+
+# --- Purge Webhook ---
+def _post_purge(keys):
+    headers = {'Content-Type': 'application/json'}
+    if PURGE_WEBHOOK_TOKEN:
+        headers['Authorization'] = f'Bearer {PURGE_WEBHOOK_TOKEN}'
+    request = urllib.request.Request(PURGE_WEBHOOK_URL, data=json.dumps({"surrogate_keys": keys}).encode('utf-8'),
+                                     headers=headers, method='POST')
+    with urllib.request.urlopen(request, timeout=PURGE_TIMEOUT) as response:
+        response.read()
+
+
+class PurgeQueue:
+    """Collects surrogate keys and sends them in one webhook call per debounce window.
+
+    A failed call is retried up to PURGE_RETRIES times per batch: after another debounce window, or
+    right away (with a short backoff) when there is no debounce.
+    """
+
+    def __init__(self, send, delay):
+        self.send = send
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._keys = set()
+        self._timer = None
+
+    def add(self, keys):
+        timer = None
+        with self._lock:
+            self._keys.update(keys)
+            if self.delay > 0 and self._timer is None:
+                timer = self._timer = threading.Timer(self.delay, self.flush)
+                timer.daemon = True
+        if timer is not None:
+            timer.start()
+        elif self.delay <= 0:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            keys, self._keys = self._keys, set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if keys:
+            self._send(sorted(keys))
+
+    def _send(self, keys, attempt=1):
+        """Send one batch; returns whether it was purged (False also while a later retry is pending)."""
+        while True:
+            try:
+                self.send(keys)
+                print(f"DEBUG: purged CDN keys {keys}")
+                return True
+            except Exception as e:
+                if attempt >= PURGE_RETRIES:
+                    print(f"Warning: CDN purge of {keys} failed {attempt} times, giving up: {e}")
+                    return False
+                print(f"Warning: CDN purge failed (attempt {attempt}), retrying: {e}")
+            if self.delay > 0:
+                timer = threading.Timer(self.delay, self._send, (keys, attempt + 1))
+                timer.daemon = True
+                timer.start()
+                return False
+            time.sleep(PURGE_RETRY_BACKOFF * attempt)
+            attempt += 1
+
+
+purge_queue = PurgeQueue(_post_purge, PURGE_DEBOUNCE) if PURGE_WEBHOOK_URL else None
+if purge_queue is not None:
+    atexit.register(purge_queue.flush)
+
+
+@event.listens_for(Session, 'after_commit')
+def _purge_committed_changes(session):
+    """Purge what a committed write changed, as recorded in session.info by content_version.py."""
+    sections = session.info.pop('changed_sections', None) or ()
+    deleted = session.info.pop('deleted_rows', None) or ()
+    keys = [section_key(section) for section in sections] + [media_key(kind, id) for kind, id in deleted]
+    if keys and purge_queue is not None:
+        purge_queue.add(keys)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_changes(session, previous_transaction):
+    session.info.pop('changed_sections', None)
+    session.info.pop('deleted_rows', None)
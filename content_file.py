@@ -0,0 +1,52 @@
+# content_file.py
+import atexit
+import os
+
+from sqlalchemy import event
+
+# Bundled with the deployment: ALLOW_NO_DB serves the site from it when it exists
+DEFAULT_CONTENT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content.db')
+# SQLite maps up to this many bytes of the file into memory, so reads are page-cache lookups
+CONTENT_FILE_MMAP_SIZE = int(os.getenv('CONTENT_FILE_MMAP_SIZE', str(256 * 1024 * 1024)))
+
+
+def content_file_read_only(path):
+    """Whether the content file has to be opened read-only (CONTENT_FILE_READ_ONLY=1/0, else auto-detected).
+
+    Serverless deployments ship it on a read-only filesystem: it then serves the site, but edits have to
+    be made elsewhere and deployed (see `flask export-content` / `flask import-content`).
+    """
+    configured = os.getenv('CONTENT_FILE_READ_ONLY')
+    if configured is not None:
+        return configured == '1'
+    if os.path.exists(path):
+        return not os.access(path, os.W_OK) or not os.access(os.path.dirname(path), os.W_OK)
+    return not os.access(os.path.dirname(path), os.W_OK)
+
+
+def content_file_uri(path, read_only):
+    """SQLAlchemy URL for the content file. Read-only files are opened immutable: no locks, no journal."""
+    if read_only:
+        return f"sqlite:///file:{path}?mode=ro&immutable=1&uri=true"
+    return f"sqlite:///{path}"
+
+
+def tune_content_file(engine, read_only):
+    """Per-connection SQLite settings for the content file engine; a writable file is switched to WAL."""
+    @event.listens_for(engine, 'connect')
+    def _connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA mmap_size = {CONTENT_FILE_MMAP_SIZE}")
+        if not read_only:
+            cursor.execute("PRAGMA busy_timeout = 5000")
+            cursor.execute("PRAGMA synchronous = NORMAL")  # safe with WAL: a crash can lose the last commits, never corrupt
+        cursor.close()
+
+    if not read_only:
+        # Persistent in the file: readers (homepage, API) never wait for the writer (CMS, job workers,
+        # click counter flushes).
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode = WAL")
+        # Closing the last connection checkpoints the WAL into the file and removes it; an immutable
+        # (read-only) copy of the file would not see commits still sitting in the WAL
+        atexit.register(engine.dispose)
@@ -0,0 +1,110 @@
+# content_version.py
+import hashlib
+from datetime import datetime, timezone
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import (Header, Banner, About, WhyChoose, Highlight, Service, Event,
+                    TeamMember, Contact, Footer, SectionVersion, ChangeCounter, Tombstone)
+
+# Homepage section each content model belongs to
+MODEL_SECTIONS = {
+    Header: 'header',
+    Banner: 'banner',
+    About: 'about',
+    WhyChoose: 'why_choose',
+    Highlight: 'highlights',
+    Service: 'services',
+    Event: 'events',
+    TeamMember: 'team',
+    Contact: 'contact',
+    Footer: 'footer',
+}
+
+
+def bump_sections(connection, sections):
+    """Increment the version of each section (sorted, so concurrent writers lock rows in the same order)."""
+    table = SectionVersion.__table__
+    for section in sorted(sections):
+        result = connection.execute(
+            table.update().where(table.c.section == section).values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(section=section, version=1))
+
+
+def next_change_seq(connection):
+    """Hand out the next global change sequence number.
+
+    The counter row stays locked until the writing transaction ends, so numbers become visible in
+    commit order and a client cursor never skips over a slower transaction's rows.
+    """
+    table = ChangeCounter.__table__
+    seq = connection.execute(
+        table.update().where(table.c.id == 1).values(seq=table.c.seq + 1).returning(table.c.seq)
+    ).scalar()
+    if seq is None:
+        seq = 1
+        connection.execute(table.insert().values(id=1, seq=seq))
+    return seq
+
+
+@event.listens_for(Session, 'before_flush')
+def _stamp_changes(session, flush_context, instances):
+    """Stamp written content rows with a change sequence number and leave tombstones for deleted ones."""
+    written = [obj for obj in session.new if type(obj) in MODEL_SECTIONS]
+    written += [obj for obj in session.dirty
+                if type(obj) in MODEL_SECTIONS and session.is_modified(obj, include_collections=False)]
+    deleted = [obj for obj in session.deleted if type(obj) in MODEL_SECTIONS]
+    if not written and not deleted:
+        return
+    seq = next_change_seq(session.connection())
+    now = datetime.now(timezone.utc)
+    for obj in written:
+        obj.change_seq = seq
+        obj.updated_at = now
+    for obj in deleted:
+        session.add(Tombstone(kind=obj.__tablename__, row_id=obj.id, change_seq=seq, deleted_at=now))
+        session.info.setdefault('deleted_rows', set()).add((obj.__tablename__, obj.id))
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_changed_sections(session, flush_context):
+    """Bump section versions in the same transaction as the content write."""
+    changed = set()
+    for obj in session.new:
+        changed.add(MODEL_SECTIONS.get(type(obj)))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            changed.add(MODEL_SECTIONS.get(type(obj)))
+    for obj in session.deleted:
+        changed.add(MODEL_SECTIONS.get(type(obj)))
+    changed.discard(None)
+    if changed:
+        bump_sections(session.connection(), changed)
+        session.info.setdefault('changed_sections', set()).update(changed)  # for the CDN purge (cdn.py)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bump_bulk_sections(orm_execute_state):
+    """Bump the section of an UPDATE/DELETE statement run through the session (no flush involved)."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    section = MODEL_SECTIONS.get(mapper.class_) if mapper is not None else None
+    if section:
+        bump_sections(orm_execute_state.session.connection(), {section})
+        orm_execute_state.session.info.setdefault('changed_sections', set()).add(section)
+
+
+def get_section_versions():
+    """Return {section: version} for every section that has been written at least once."""
+    rows = db.session.execute(select(SectionVersion.section, SectionVersion.version)).all()
+    return {section: version for section, version in rows}
+
+
+def version_tag(versions):
+    """Short tag for a {section: version} map; it changes whenever any section is written."""
+    return hashlib.sha1(repr(sorted(versions.items())).encode('utf-8')).hexdigest()[:12]
@@ -0,0 +1,110 @@
+# counters.py
+import atexit
+import os
+import threading
+
+from sqlalchemy import func, select
+
+from cache import cache
+from extensions import db
+from models import About
+
+# Buffered hits are written to the database every CLICK_FLUSH_INTERVAL seconds, or sooner once
+# CLICK_FLUSH_THRESHOLD of them are pending
+CLICK_FLUSH_INTERVAL = float(os.getenv('CLICK_FLUSH_INTERVAL', '10'))
+CLICK_FLUSH_THRESHOLD = int(os.getenv('CLICK_FLUSH_THRESHOLD', '100'))
+# How long an instance shows a total it didn't flush itself before re-reading it
+CLICKS_CACHE_TTL = int(os.getenv('CLICKS_CACHE_TTL', '60'))
+
+
+class BufferedCounter:
+    """Counts hits in process and hands them to `apply_delta` in batches from a background thread.
+
+    hit() only takes a lock and bumps an int. Failed flushes keep their hits for the next attempt.
+    """
+
+    def __init__(self, apply_delta, interval, threshold):
+        self.apply_delta = apply_delta
+        self.interval = interval
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._wake = threading.Event()
+        self._thread = None
+
+    def hit(self, n=1):
+        with self._lock:
+            self._pending += n
+            due = self._pending >= self.threshold
+            if self._thread is None:  # started on first use, so CLI commands never spawn it
+                self._thread = threading.Thread(target=self._run, name='click-counter-flush', daemon=True)
+                self._thread.start()
+        if due:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def flush(self):
+        with self._lock:
+            delta, self._pending = self._pending, 0
+        if not delta:
+            return
+        try:
+            self.apply_delta(delta)
+        except Exception as e:
+            print(f"Warning: could not flush {delta} buffered hits, keeping them for the next flush: {e}")
+            with self._lock:
+                self._pending += delta
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+# --- About.clicks ---
+click_counter = None
+
+
+def _about_row():
+    return About.__table__.c.id == select(func.min(About.__table__.c.id)).scalar_subquery()
+
+
+def init_click_counter(app):
+    """Create the About.clicks counter for this process and flush it at interpreter exit."""
+    global click_counter
+    table = About.__table__
+
+    def add_clicks(delta):
+        # Core statement on the primary: a counter flush is not a content edit, so it bumps
+        # neither the row version nor the change sequence
+        with app.app_context(), db.engine.begin() as connection:
+            total = connection.execute(
+                table.update().where(_about_row()).values(clicks=table.c.clicks + delta).returning(table.c.clicks)
+            ).scalar()
+        if total is not None:
+            cache.set('counter', 'about_clicks', total, ttl=CLICKS_CACHE_TTL)
+
+    click_counter = BufferedCounter(add_clicks, CLICK_FLUSH_INTERVAL, CLICK_FLUSH_THRESHOLD)
+    atexit.register(click_counter.flush)
+    return click_counter
+
+
+def count_homepage_visit():
+    if click_counter is not None:
+        click_counter.hit()
+
+
+def pending_visits():
+    """Visits this process counted that are not flushed yet."""
+    return click_counter.pending() if click_counter is not None else 0
+
+
+def displayed_clicks():
+    """About.clicks as of the last flush, from the cache (read from the database at most once per TTL)."""
+    return cache.get_or_set('counter', 'about_clicks',
+                            lambda: db.session.scalar(select(About.clicks).where(_about_row())) or 0,
+                            ttl=CLICKS_CACHE_TTL)
@@ -0,0 +1,181 @@
+# data_migrations.py
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import click
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+import jobs
+from extensions import db
+from models import DataMigration
+from schema_state import advisory_lock
+
+DATA_MIGRATION_BATCH_SIZE = int(os.getenv('DATA_MIGRATION_BATCH_SIZE', '100'))
+# Seconds between batches, so a migration never keeps the database busy for long stretches
+DATA_MIGRATION_PAUSE = float(os.getenv('DATA_MIGRATION_PAUSE', '0.1'))
+# Batches one background job runs before handing over to a fresh job (stays well inside time limits)
+DATA_MIGRATION_JOB_BATCHES = int(os.getenv('DATA_MIGRATION_JOB_BATCHES', '50'))
+
+_migrations = {}
+
+
+def data_migration(name, batch_size=None):
+    """Register fn(connection, position, limit) as a batched data migration called `name`.
+
+    fn changes up to `limit` rows past `position` (None on the first batch) on the given connection,
+    inside the batch's transaction, and returns (new position, rows changed). Positions are JSON values
+    (usually the last primary key handled); returning None as the position marks the migration done.
+    """
+    def register(fn):
+        _migrations[name] = (fn, batch_size or DATA_MIGRATION_BATCH_SIZE)
+        return fn
+    return register
+
+
+def registered():
+    return sorted(_migrations)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def progress(name):
+    """The migration's progress row (status, position, batches, rows, error, timestamps)."""
+    table = DataMigration.__table__
+    query = select(table).where(table.c.name == name)
+    with db.engine.connect() as connection:
+        row = connection.execute(query).first()
+        connection.rollback()
+        if row is None:
+            try:
+                with connection.begin():
+                    connection.execute(table.insert().values(name=name, status='pending', batches=0, rows=0))
+            except IntegrityError:
+                pass  # created concurrently
+            row = connection.execute(query).first()
+        return row
+
+
+def _set_status(name, status, **values):
+    table = DataMigration.__table__
+    with db.engine.begin() as connection:
+        connection.execute(table.update().where(table.c.name == name).values(status=status, **values))
+
+
+def start(name):
+    """Mark a pending, paused or failed migration as running, so run() (and its background jobs) work on it."""
+    if name not in _migrations:
+        raise LookupError(f"No data migration registered as {name!r}")
+    row = progress(name)
+    if row.status == 'done':
+        return row.status
+    _set_status(name, 'running', error=None, started_at=row.started_at or _now(), updated_at=_now())
+    return 'running'
+
+
+def pause(name):
+    """Stop the migration after its current batch; start() resumes it from where it stopped."""
+    if progress(name).status in ('pending', 'running'):
+        _set_status(name, 'paused', updated_at=_now())
+    return progress(name).status
+
+
+def run(name, max_batches=None, batch_size=None, pause_between=DATA_MIGRATION_PAUSE):
+    """Run batches of a running migration until it is done, paused, failed or max_batches ran.
+
+    Each batch commits its changes together with the new position, so a crash or pause resumes at the
+    first batch that didn't commit. Only one process works on a migration at a time (on Postgres).
+    Returns the migration's status, or 'busy' when another process holds it.
+    """
+    fn, default_size = _migrations[name]
+    limit = batch_size or default_size
+    table = DataMigration.__table__
+    done = 0
+    progress(name)  # make sure its progress row exists
+    with db.engine.connect() as connection, \
+            advisory_lock(connection, f"data-migration:{name}", wait=False) as locked:
+        if not locked:
+            print(f"DEBUG: data migration {name} is already being run elsewhere")
+            return 'busy'
+        while max_batches is None or done < max_batches:
+            try:
+                with connection.begin():
+                    row = connection.execute(
+                        select(table.c.status, table.c.position).where(table.c.name == name)).one()
+                    if row.status != 'running':
+                        return row.status
+                    position, rows = fn(connection, json.loads(row.position) if row.position else None, limit)
+                    finished = position is None
+                    values = dict(batches=table.c.batches + 1, rows=table.c.rows + rows, updated_at=_now())
+                    if finished:
+                        values.update(status='done', finished_at=_now())
+                    else:
+                        values.update(position=json.dumps(position))
+                    connection.execute(table.update().where(table.c.name == name).values(**values))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"Warning: data migration {name} failed, resume with `flask run-data-migration {name}`: {error}")
+                with connection.begin():
+                    connection.execute(table.update().where(table.c.name == name)
+                                       .values(status='failed', error=error, updated_at=_now()))
+                return 'failed'
+            done += 1
+            if finished:
+                print(f"DEBUG: data migration {name} done")
+                return 'done'
+            if pause_between:
+                time.sleep(pause_between)
+    return 'running'
+
+
+@jobs.handler('data_migration')
+def data_migration_job(name):
+    status = run(name, max_batches=DATA_MIGRATION_JOB_BATCHES)
+    if status == 'running':
+        jobs.enqueue('data_migration', name=name)  # carry on in a fresh job, with a fresh time budget
+    return {"status": status}
+
+
+# --- CLI ---
+@click.command('data-migrations')
+def data_migrations_command():
+    """List registered data migrations and their progress."""
+    for name in registered():
+        row = progress(name)
+        detail = f"{row.batches} batches, {row.rows} rows, at {row.position or '-'}"
+        click.echo(f"{name}: {row.status} ({detail})" + (f" - {row.error}" if row.error else ""))
+
+
+@click.command('run-data-migration')
+@click.argument('name')
+@click.option('--batch-size', type=int, default=None, help='Rows per batch (default: the migration\'s own).')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches (resume later).')
+@click.option('--pause', 'pause_between', default=DATA_MIGRATION_PAUSE, show_default=True,
+              help='Seconds to wait between batches.')
+@click.option('--background', is_flag=True,
+              help='Queue it for the job workers (`flask run-jobs`) instead of running it here.')
+def run_data_migration_command(name, batch_size, max_batches, pause_between, background):
+    """Start or resume a data migration."""
+    if start(name) == 'done':
+        click.echo(f"{name} is already done.")
+        return
+    if background:
+        job = jobs.enqueue('data_migration', name=name)
+        db.session.info.pop('wake_jobs', None)  # for the workers; don't start this process's pool on it
+        db.session.commit()
+        click.echo(f"Queued {name} as job {job.id}.")
+        return
+    status = run(name, max_batches=max_batches, batch_size=batch_size, pause_between=pause_between)
+    row = progress(name)
+    click.echo(f"{name}: {status} after {row.batches} batches, {row.rows} rows.")
+
+
+@click.command('pause-data-migration')
+@click.argument('name')
+def pause_data_migration_command(name):
+    """Pause a data migration after its current batch."""
+    click.echo(f"{name}: {pause(name)}")
@@ -0,0 +1,125 @@
+# dto.py
+# Read-only view objects for the homepage sections and the CMS singleton reads. They are filled
+# from plain column rows (see repository.first_view/ordered_views), so rendering never goes through
+# ORM attribute instrumentation and nothing is left in the session's identity map. Frozen slotted
+# dataclasses: small, cheap attribute access from Jinja, and picklable for the cache tiers.
+from dataclasses import dataclass
+from typing import ClassVar
+
+from models import Header, Banner, About, WhyChoose, Highlight, Service, Event, TeamMember, Contact, Footer
+
+
+@dataclass(frozen=True, slots=True)
+class ImageView:
+    # `image` is only loaded when there is no image_hash (e.g. an external URL); otherwise templates
+    # link to /media and the blob stays in the database
+    image: str | None
+    image_width: int | None
+    image_height: int | None
+    image_color: str | None
+    image_placeholder: str | None
+    image_hash: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class HeaderView:
+    model: ClassVar = Header
+    id: int
+    version: int
+    logo: str
+
+
+@dataclass(frozen=True, slots=True)
+class BannerView(ImageView):
+    model: ClassVar = Banner
+    id: int
+    version: int
+    title: str
+    subtitle: str
+
+
+@dataclass(frozen=True, slots=True)
+class AboutView:
+    model: ClassVar = About
+    id: int
+    version: int
+    description: str
+    logo: str
+    collaborators: int
+    students: int
+    projects: int
+    clicks: int
+
+
+@dataclass(frozen=True, slots=True)
+class WhyChooseView:
+    model: ClassVar = WhyChoose
+    id: int
+    title: str
+    icon: str
+    description: str
+
+
+@dataclass(frozen=True, slots=True)
+class HighlightView(ImageView):
+    model: ClassVar = Highlight
+    id: int
+
+
+@dataclass(frozen=True, slots=True)
+class ServiceView:
+    model: ClassVar = Service
+    id: int
+    title: str | None
+    icon: str | None
+    description: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class AdditionalServicesView:
+    model: ClassVar = Service
+    id: int
+    version: int
+    additional_services: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class EventView(ImageView):
+    model: ClassVar = Event
+    id: int
+    title: str
+    year: str
+
+
+@dataclass(frozen=True, slots=True)
+class TeamMemberView(ImageView):
+    model: ClassVar = TeamMember
+    id: int
+    name: str
+    title: str
+    bio: str
+    linkedin: str | None
+    github: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class ContactView:
+    model: ClassVar = Contact
+    id: int
+    version: int
+    location: str
+    email: str
+    phone: str
+
+
+@dataclass(frozen=True, slots=True)
+class FooterView:
+    model: ClassVar = Footer
+    id: int
+    version: int
+    address: str
+    email: str
+    phone: str
+    linkedin: str | None
+    github: str | None
+    twitter: str | None
@@ -0,0 +1,180 @@
+# fragments.py
+import os
+import threading
+import time
+
+from flask import render_template, stream_template
+from markupsafe import Markup
+
+from cache import cache
+from content_version import version_tag
+from routing import run_on_replica
+from singleflight import SingleFlight, SingleFlightTimeout
+import repository
+from dto import (HeaderView, BannerView, AboutView, WhyChooseView, HighlightView, ServiceView,
+                 AdditionalServicesView, EventView, TeamMemberView, ContactView, FooterView)
+from models import Service
+
+# Homepage sections in page order; each renders templates/sections/<name>.html
+SECTIONS = ('header', 'banner', 'about', 'why_choose', 'highlights',
+            'services', 'events', 'team', 'contact', 'footer')
+
+# Safety net for writes that bypass the app (manual SQL) and so never bump a section version
+FRAGMENT_CACHE_TTL = int(os.getenv('FRAGMENT_CACHE_TTL', '300'))
+# How long concurrent misses for a section wait on its in-flight render before serving its last good render
+HOMEPAGE_BUILD_TIMEOUT = float(os.getenv('HOMEPAGE_BUILD_TIMEOUT', '5'))
+
+
+# --- Section Loaders ---
+# Sections render from dto view objects; image blobs aren't loaded, sections link to /media URLs.
+def _load_services():
+    additional = repository.first_view(AdditionalServicesView, Service.is_additional)
+    return {"services": repository.ordered_views(ServiceView, ~Service.is_additional),
+            "additional_services": additional.additional_services if additional else ''}
+
+
+SECTION_LOADERS = {
+    'header': lambda: {"header": repository.first_view(HeaderView)},
+    'banner': lambda: {"banner": repository.first_view(BannerView)},
+    'about': lambda: {"about": repository.first_view(AboutView)},
+    'why_choose': lambda: {"why_choose": repository.ordered_views(WhyChooseView)},
+    'highlights': lambda: {"highlights": repository.ordered_views(HighlightView)},
+    'services': _load_services,
+    'events': lambda: {"events": repository.ordered_views(EventView)},
+    'team': lambda: {"team": repository.ordered_views(TeamMemberView)},
+    'contact': lambda: {"contact": repository.first_view(ContactView)},
+    'footer': lambda: {"footer": repository.first_view(FooterView)},
+}
+
+
+# --- Fragment Cache ---
+_section_flight = SingleFlight()
+_last_good_fragments = {}  # section -> most recent HTML this instance rendered or read for it
+
+
+def render_section(name, context):
+    return Markup(render_template(f'sections/{name}.html', **context))
+
+
+def _fragment_key(name, versions):
+    return f"{name}:{versions.get(name, 0)}"
+
+
+def _build_fragment(name, key):
+    # The about section's visit total is as of this render; the page's /visit beacon shows the live one
+    html = render_section(name, SECTION_LOADERS[name]())
+    cache.set('fragment', key, html, ttl=FRAGMENT_CACHE_TTL)
+    return html
+
+
+def render_cached_section(name, versions):
+    """Render one homepage section, reusing its cached fragment while the section version is unchanged.
+
+    Returns (html, current). Concurrent misses for the same fragment share one render; followers that
+    wait longer than HOMEPAGE_BUILD_TIMEOUT get the section's last good render (current is False),
+    and only render it themselves when there is none.
+    """
+    key = _fragment_key(name, versions)
+    html = cache.get('fragment', key)
+    if html is None:
+        try:
+            html = _section_flight.do(key, lambda: _build_fragment(name, key), timeout=HOMEPAGE_BUILD_TIMEOUT)
+        except SingleFlightTimeout:
+            html = _last_good_fragments.get(name)
+            if html is not None:
+                print(f"Warning: {name} section build exceeded {HOMEPAGE_BUILD_TIMEOUT}s; serving last good render.")
+                return Markup(html), False
+            html = _build_fragment(name, key)
+    _last_good_fragments[name] = html
+    return Markup(html), True
+
+
+def render_static_sections(context):
+    """Render every section from a fixed context (no DB, no caching)."""
+    return {name: render_section(name, context) for name in SECTIONS}
+
+
+# --- Homepage ---
+_snapshot_lock = threading.Lock()
+_last_good = {"key": None, "html": None, "expires_at": 0.0}
+
+
+def last_good_homepage():
+    """Most recent successfully rendered homepage HTML, or None."""
+    return _last_good["html"]
+
+
+def _homepage_key(versions):
+    return tuple(sorted(versions.items()))
+
+
+def _page_key(key):
+    return ','.join(f"{section}={version}" for section, version in key)
+
+
+def cached_homepage(versions):
+    """The finished homepage for this content version, from this instance or a shared cache tier, or None."""
+    key = _homepage_key(versions)
+    with _snapshot_lock:
+        if _last_good["key"] == key and _last_good["expires_at"] > time.monotonic():
+            return _last_good["html"]
+    return cache.get('page', _page_key(key))
+
+
+def _remember_homepage(key, html):
+    cache.set('page', _page_key(key), html, ttl=FRAGMENT_CACHE_TTL)
+    with _snapshot_lock:
+        _last_good.update(key=key, html=html, expires_at=time.monotonic() + FRAGMENT_CACHE_TTL)
+
+
+def banner_for_preload(versions):
+    """The banner view (the page's largest image) for preload hints, cached per banner version."""
+    banner = cache.get_or_set('fragment', f"banner-preload:{versions.get('banner', 0)}",
+                              lambda: repository.first_view(BannerView) or False, ttl=FRAGMENT_CACHE_TTL)
+    return banner or None
+
+
+class _StreamedSections:
+    """`sections` for a streamed index.html: each fragment is rendered when the template reaches it."""
+
+    def __init__(self, versions, static_context):
+        self.versions = versions
+        self.static_context = static_context
+        self.failed = False
+
+    def __getattr__(self, name):
+        if name not in SECTIONS:
+            raise AttributeError(name)
+        try:
+            html, current = run_on_replica(lambda: render_cached_section(name, self.versions))
+            if not current:
+                self.failed = True  # an older render of the section: don't cache the page as this version
+            return html
+        except Exception as e:
+            # The head and earlier sections are already sent, so only this section falls back
+            print(f"Warning: {name} section failed mid-stream, sending its static version: {e}")
+            self.failed = True
+            return render_section(name, self.static_context())
+
+
+def stream_homepage(versions, static_context=None, **context):
+    """Render the homepage as a stream of chunks: everything before the first section (the <head>
+    with its stylesheets and preloads) goes out before any section is rendered.
+
+    The finished page is cached for the content version unless a section had to fall back. Its
+    headers are sent before any section renders, so the response itself must stay out of shared
+    caches (see cdn.keep_private); the complete page is served whole from the page cache next time.
+    """
+    sections = _StreamedSections(versions, static_context)
+    # Called here rather than inside the generator below so it binds the current request context
+    chunks = stream_template('index.html', sections=sections, content_version=version_tag(versions), **context)
+    return _tee_homepage(chunks, _homepage_key(versions), sections)
+
+
+def _tee_homepage(chunks, key, sections):
+    sent = []
+    for chunk in chunks:
+        sent.append(chunk)
+        yield chunk
+    if not sections.failed:
+        _remember_homepage(key, ''.join(sent))
@@ -0,0 +1,101 @@
+# image_storage.py
+# Uploaded images are stored decoded: <field>_data holds the bytes, <field>_mime the type, and the
+# text column <field> is NULL. The text column keeps everything else: external URLs, plain text, and
+# data URLs that would not re-encode to exactly the same string. Rows written before binary storage
+# keep their data URL in the text column until the `binary_images` data migration converts them, and
+# reads fall back to it until then.
+import base64
+import os
+
+from sqlalchemy import func, select
+
+from data_migrations import data_migration
+from images import image_digest, parse_data_url
+from models import Header, Banner, About, Highlight, Event, TeamMember
+
+IMAGE_FIELDS = {Header: 'logo', Banner: 'image', About: 'logo', Highlight: 'image', Event: 'image', TeamMember: 'image'}
+# Rows per conversion batch; each batch holds its images in memory and row-locks only those rows
+IMAGE_CONVERT_BATCH_SIZE = int(os.getenv('IMAGE_CONVERT_BATCH_SIZE', '20'))
+
+
+def data_url(mime, data):
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def split_image(value):
+    """(mime, bytes) for a data URL that re-encodes to exactly `value`; None for anything else."""
+    parsed = parse_data_url(value)
+    if parsed is None or data_url(*parsed) != value:
+        return None
+    return parsed
+
+
+def storage_values(field, value):
+    """Column values that store `value` in `field`: decoded bytes for a data URL, else the text itself."""
+    parsed = split_image(value)
+    if parsed is None:
+        return {field: value, f'{field}_data': None, f'{field}_mime': None}
+    mime, data = parsed
+    return {field: None, f'{field}_data': data, f'{field}_mime': mime}
+
+
+def set_image(obj, field, value):
+    for column, stored in storage_values(field, value).items():
+        setattr(obj, column, stored)
+
+
+def stored_image(text, data, mime):
+    """The value clients see (the data URL, or the text) from the three stored columns."""
+    return text if data is None else data_url(mime, bytes(data))
+
+
+def image_payload(text, data, mime):
+    """(mime, bytes) to serve from the stored columns, or None when they hold no image."""
+    if data is not None:
+        return mime, bytes(data)
+    return parse_data_url(text)
+
+
+# --- Conversion ---
+@data_migration('binary_images', batch_size=IMAGE_CONVERT_BATCH_SIZE)
+def convert_images(connection, position, limit):
+    """Move data URLs from the text columns into <field>_data/<field>_mime, table by table in id order.
+
+    Each converted row is read back and must re-encode to the original text, or the batch rolls back.
+    Rows are locked only for their batch, so editors are never blocked for long.
+    """
+    models = list(IMAGE_FIELDS)
+    index, after = position or (0, 0)
+    while True:
+        if index >= len(models):
+            return None, 0
+        table = models[index].__table__
+        field = IMAGE_FIELDS[models[index]]
+        text, data, mime = table.c[field], table.c[f'{field}_data'], table.c[f'{field}_mime']
+        rows = connection.execute(
+            select(table.c.id, text).where(table.c.id > after, text.is_not(None))
+            .order_by(table.c.id).limit(limit).with_for_update()
+        ).all()
+        if rows:
+            break
+        index, after = index + 1, 0
+
+    originals = {}
+    for id, value in rows:
+        parsed = split_image(value)
+        if parsed is None:
+            if value.startswith('data:'):
+                print(f"Warning: {table.name} {id}: {field} is not canonical base64, left as text")
+            continue
+        values = {field: None, f'{field}_data': parsed[1], f'{field}_mime': parsed[0]}
+        if 'image_hash' in table.c:
+            # Rows uploaded before content hashes were recorded are linked from /media from now on
+            values['image_hash'] = func.coalesce(table.c.image_hash, image_digest(parsed[1]))
+        connection.execute(table.update().where(table.c.id == id).values(values))
+        originals[id] = value
+    if originals:
+        for id, stored, type_ in connection.execute(
+                select(table.c.id, data, mime).where(table.c.id.in_(list(originals)))):
+            if stored is None or data_url(type_, bytes(stored)) != originals[id]:
+                raise ValueError(f"{table.name} {id}: stored image does not round-trip to the original data URL")
+    return [index, rows[-1].id], len(originals)
@@ -0,0 +1,90 @@
+# images.py
+import base64
+import binascii
+import hashlib
+import io
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only the content hash is recorded
+    Image = None
+
+PLACEHOLDER_SIZE = 16  # longest side of the LQIP thumbnail, in pixels
+PLACEHOLDER_QUALITY = 40
+
+# Per-field targets the CMS resizes and re-encodes uploads to in the browser before sending them:
+# the image is scaled down to fit max_width x max_height and encoded as `type` at `quality`
+# (`fallback_type` where the browser can't encode `type`). Team photos display at 128px, so 256px
+# covers high-DPI screens; logos keep an alpha-capable fallback. Rendered into cms.html as its schema.
+UPLOAD_LIMITS = {
+    'banner.image': dict(max_width=1920, max_height=1080, type='image/webp', fallback_type='image/jpeg', quality=0.82),
+    'about.logo': dict(max_width=600, max_height=600, type='image/webp', fallback_type='image/png', quality=0.9),
+    'highlight.image': dict(max_width=1200, max_height=900, type='image/webp', fallback_type='image/jpeg', quality=0.8),
+    'event.image': dict(max_width=1200, max_height=900, type='image/webp', fallback_type='image/jpeg', quality=0.8),
+    'team.image': dict(max_width=256, max_height=256, type='image/webp', fallback_type='image/jpeg', quality=0.85),
+}
+
+
+def parse_data_url(value):
+    """Split a base64 data URL into (mime type, bytes); None if it isn't one."""
+    if not value or not value.startswith('data:'):
+        return None
+    header, sep, payload = value.partition(',')
+    if not sep or not header.endswith(';base64'):
+        return None
+    mime = header[len('data:'):-len(';base64')] or 'application/octet-stream'
+    try:
+        return mime, base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def image_digest(data):
+    """Short content hash used in media URLs."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _placeholder(img):
+    thumb = img.copy()
+    thumb.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buf = io.BytesIO()
+    thumb.convert('RGB').save(buf, format='JPEG', quality=PLACEHOLDER_QUALITY, optimize=True)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def _dominant_color(img):
+    r, g, b = img.convert('RGB').resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def image_identity(value):
+    """The image_* column values known without decoding the image: only the content hash is set.
+
+    Size, colour and placeholder are filled in later from image_metadata (see the image_metadata job).
+    """
+    meta = dict(image_width=None, image_height=None, image_color=None, image_placeholder=None, image_hash=None)
+    parsed = parse_data_url(value)
+    if parsed is not None:
+        meta['image_hash'] = image_digest(parsed[1])
+    return meta
+
+
+def image_metadata(value):
+    """Return the image_* column values for an uploaded image (all None if it can't be decoded)."""
+    meta = dict(image_width=None, image_height=None, image_color=None, image_placeholder=None, image_hash=None)
+    parsed = parse_data_url(value)
+    if parsed is None:
+        return meta
+    _, data = parsed
+    meta['image_hash'] = image_digest(data)
+    if Image is None:
+        return meta
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            meta['image_width'], meta['image_height'] = img.size
+            meta['image_color'] = _dominant_color(img)
+            meta['image_placeholder'] = _placeholder(img)
+    except Exception as e:
+        print(f"Warning: could not read uploaded image for metadata: {e}")
+    return meta
@@ -0,0 +1,205 @@
+# jobs.py
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from sqlalchemy import and_, event, or_, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Job
+
+# thread: committed jobs start right away on this process's worker pool (and `flask run-jobs` picks up
+# anything left over); external: requests only enqueue, a separate `flask run-jobs` process runs them
+# (for where background threads are frozen between requests). On Vercel (VERCEL is set) the default
+# is external. Jobs then run from:
+# - the cron in vercel.json, which calls /api/cron/run-jobs. It needs CRON_SECRET set in the project
+#   (Vercel sends it with each cron request; the route refuses requests without it). The shipped
+#   schedule is daily, the most often Hobby plans allow, so it is only a backstop: on Pro, change it
+#   to "* * * * *" to get image metadata within a minute of an upload;
+# - otherwise `flask run-jobs` (a long-running worker) or `flask run-jobs --once` from any scheduler,
+#   run elsewhere against the same database.
+JOB_MODE = os.getenv('JOB_MODE', 'external' if os.getenv('VERCEL') else 'thread')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+# Failed attempts are retried after JOB_RETRY_DELAY seconds, doubling each time
+JOB_RETRY_DELAY = float(os.getenv('JOB_RETRY_DELAY', '5'))
+# A running job whose worker disappeared (crash, frozen function) is handed out again after this long
+JOB_LEASE = int(os.getenv('JOB_LEASE', '300'))
+# A cron run stops claiming jobs after this many seconds, so it finishes within the function's maxDuration
+JOB_CRON_BUDGET = float(os.getenv('JOB_CRON_BUDGET', '40'))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_handlers = {}
+
+
+def handler(kind):
+    """Register fn as the handler for jobs of this kind; it gets the job payload as keyword arguments
+    and returns a JSON-serializable result (or None)."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def enqueue(kind, **payload):
+    """Add a job to the current session; workers see it once the caller's transaction commits."""
+    now = _now()
+    job = Job(kind=kind, payload=json.dumps(payload), status='queued', attempts=0,
+              max_attempts=JOB_MAX_ATTEMPTS, run_after=now, created_at=now)
+    db.session.add(job)
+    db.session.flush()  # assigns job.id, so the caller can return it without a query after commit
+    db.session.info['wake_jobs'] = current_app._get_current_object()
+    return job
+
+
+@event.listens_for(Session, 'after_commit')
+def _start_committed_jobs(session):
+    app = session.info.pop('wake_jobs', None)
+    if app is not None and JOB_MODE == 'thread':
+        wake(app)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_jobs(session, previous_transaction):
+    session.info.pop('wake_jobs', None)
+
+
+# --- Running Jobs ---
+def _claim():
+    """Mark the oldest due job as running for this worker and return it (None when nothing is due)."""
+    claimed = db.session.execute(claim_update(_now())).first()
+    db.session.commit()
+    return claimed
+
+
+def claim_update(now):
+    """UPDATE ... RETURNING that claims the oldest job due at `now` for this worker."""
+    table = Job.__table__
+    due = (select(table.c.id)
+           .where(or_(and_(table.c.status == 'queued', table.c.run_after <= now),
+                      and_(table.c.status == 'running', table.c.lease_expires_at < now)))
+           .order_by(table.c.id).limit(1)
+           .with_for_update(skip_locked=True))  # concurrent workers on Postgres skip each other's claims
+    return (table.update().where(table.c.id == due.scalar_subquery())
+            .values(status='running', attempts=table.c.attempts + 1, worker=WORKER_ID,
+                    lease_expires_at=now + timedelta(seconds=JOB_LEASE))
+            .returning(table.c.id, table.c.kind, table.c.payload, table.c.attempts, table.c.max_attempts))
+
+
+def _record(job_id, **values):
+    table = Job.__table__
+    db.session.execute(table.update().where(table.c.id == job_id).values(**values))
+    db.session.commit()
+
+
+def run_next():
+    """Claim and run one due job. Returns its id, or None when no job was due."""
+    job = _claim()
+    if job is None:
+        return None
+    try:
+        fn = _handlers.get(job.kind)
+        if fn is None:
+            raise LookupError(f"No handler registered for job kind {job.kind!r}")
+        result = fn(**json.loads(job.payload))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        error = f"{type(e).__name__}: {e}"
+        if job.attempts < job.max_attempts:
+            delay = JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            print(f"Warning: job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying in {delay:.0f}s: {error}")
+            _record(job.id, status='queued', error=error, run_after=_now() + timedelta(seconds=delay),
+                    lease_expires_at=None)
+            if JOB_MODE == 'thread' and _app is not None:
+                _retry_later(delay)
+        else:
+            print(f"Warning: job {job.id} ({job.kind}) failed after {job.attempts} attempts: {error}")
+            _record(job.id, status='failed', error=error, finished_at=_now(), lease_expires_at=None)
+        return job.id
+    _record(job.id, status='done', result=json.dumps(result), error=None, finished_at=_now(), lease_expires_at=None)
+    print(f"DEBUG: job {job.id} ({job.kind}) done")
+    return job.id
+
+
+def run_pending(budget=None):
+    """Run due jobs until none are left, or until `budget` seconds have passed; returns how many ran."""
+    deadline = None if budget is None else time.monotonic() + budget
+    count = 0
+    while (deadline is None or time.monotonic() < deadline) and run_next() is not None:
+        count += 1
+    return count
+
+
+# --- In-Process Worker Pool ---
+_executor = None
+_lock = threading.Lock()
+_draining = 0
+_missed = False  # a wake arrived while every worker was busy (they may already have seen an empty queue)
+_app = None
+
+
+def _drain(app):
+    global _draining, _missed
+    try:
+        with app.app_context():
+            try:
+                run_pending()
+            except Exception as e:
+                print(f"Warning: background job worker stopped: {e}")
+            finally:
+                db.session.remove()
+    finally:
+        with _lock:
+            _draining -= 1
+            again, _missed = _missed, False
+        if again:
+            wake(app)
+
+
+def wake(app):
+    """Start a pool worker on due jobs, unless JOB_WORKERS of them are already draining the queue."""
+    global _executor, _draining, _missed, _app
+    with _lock:
+        _app = app
+        if _draining >= JOB_WORKERS:
+            _missed = True  # the running workers keep claiming until the queue is empty
+            return
+        if _executor is None:  # created on first use, so CLI commands never start it
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job-worker')
+        _draining += 1
+    _executor.submit(_drain, app)
+
+
+def _retry_later(delay):
+    timer = threading.Timer(delay, lambda: wake(_app))
+    timer.daemon = True
+    timer.start()
+
+
+# --- CLI ---
+@click.command('run-jobs')
+@click.option('--once', is_flag=True, help='Run the jobs that are due now and exit.')
+@click.option('--poll', default=2.0, show_default=True, help='Seconds to wait between checks for new jobs.')
+def run_jobs_command(once, poll):
+    """Run background jobs from the job table (as a separate worker process, or from a cron with --once)."""
+    click.echo(f"Job worker {WORKER_ID} started.")
+    while True:
+        count = run_pending()
+        if count:
+            click.echo(f"Ran {count} jobs.")
+        if once:
+            return
+        time.sleep(poll)
@@ -0,0 +1,58 @@
+"""Add change sequence, updated_at and tombstones for delta sync
+
+Revision ID: 20a8b2c41a36
+Revises: 8df2a245f72f
+Create Date: 2026-10-19 13:52:10.418377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20a8b2c41a36'
+down_revision = '8df2a245f72f'
+branch_labels = None
+depends_on = None
+
+TABLES = ('header', 'banner', 'about', 'why_choose', 'highlight',
+          'service', 'event', 'team_member', 'contact', 'footer')
+
+
+def upgrade():
+    change_counter = op.create_table('change_counter',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(change_counter, [{'id': 1, 'seq': 0}])
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tombstone_change_seq'), ['change_seq'], unique=False)
+
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table}_change_seq'), ['change_seq'], unique=False)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_change_seq'))
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('change_seq')
+
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tombstone_change_seq'))
+
+    op.drop_table('tombstone')
+    op.drop_table('change_counter')
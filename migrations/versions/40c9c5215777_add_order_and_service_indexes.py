@@ -0,0 +1,36 @@
+"""Add order_id and service partial indexes
+
+Revision ID: 40c9c5215777
+Revises: a1cbaaafcb8e
+Create Date: 2026-10-19 11:20:54.730112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '40c9c5215777'
+down_revision = 'a1cbaaafcb8e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_why_choose_order_id'), 'why_choose', ['order_id'], unique=False)
+    op.create_index(op.f('ix_highlight_order_id'), 'highlight', ['order_id'], unique=False)
+    op.create_index(op.f('ix_event_order_id'), 'event', ['order_id'], unique=False)
+    op.create_index(op.f('ix_team_member_order_id'), 'team_member', ['order_id'], unique=False)
+    op.create_index('ix_service_order_id_regular', 'service', ['order_id'], unique=False,
+                    postgresql_where=sa.text('NOT is_additional'), sqlite_where=sa.text('NOT is_additional'))
+    op.create_index('ix_service_is_additional', 'service', ['is_additional'], unique=False,
+                    postgresql_where=sa.text('is_additional'), sqlite_where=sa.text('is_additional'))
+
+
+def downgrade():
+    op.drop_index('ix_service_is_additional', table_name='service')
+    op.drop_index('ix_service_order_id_regular', table_name='service')
+    op.drop_index(op.f('ix_team_member_order_id'), table_name='team_member')
+    op.drop_index(op.f('ix_event_order_id'), table_name='event')
+    op.drop_index(op.f('ix_highlight_order_id'), table_name='highlight')
+    op.drop_index(op.f('ix_why_choose_order_id'), table_name='why_choose')
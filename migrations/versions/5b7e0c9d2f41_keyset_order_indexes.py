@@ -0,0 +1,38 @@
+"""Index ordered tables on (order_id, id) for keyset pagination
+
+Revision ID: 5b7e0c9d2f41
+Revises: df170df1db3d
+Create Date: 2026-10-19 21:14:08.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e0c9d2f41'
+down_revision = 'df170df1db3d'
+branch_labels = None
+depends_on = None
+
+# Pages are read with (order_id, id) > (:order_id, :id) ORDER BY order_id, id: with id in the index too,
+# each page is an index range scan with no sort. The composite indexes replace the order_id-only ones.
+ORDERED_TABLES = ('why_choose', 'highlight', 'event', 'team_member')
+
+
+def upgrade():
+    for table in ORDERED_TABLES:
+        op.create_index(f'ix_{table}_order_id_id', table, ['order_id', 'id'], unique=False)
+        op.drop_index(f'ix_{table}_order_id', table_name=table)
+    op.create_index('ix_service_order_id_id_regular', 'service', ['order_id', 'id'], unique=False,
+                    postgresql_where=sa.text('NOT is_additional'), sqlite_where=sa.text('NOT is_additional'))
+    op.drop_index('ix_service_order_id_regular', table_name='service')
+
+
+def downgrade():
+    op.create_index('ix_service_order_id_regular', 'service', ['order_id'], unique=False,
+                    postgresql_where=sa.text('NOT is_additional'), sqlite_where=sa.text('NOT is_additional'))
+    op.drop_index('ix_service_order_id_id_regular', table_name='service')
+    for table in ORDERED_TABLES:
+        op.create_index(f'ix_{table}_order_id', table, ['order_id'], unique=False)
+        op.drop_index(f'ix_{table}_order_id_id', table_name=table)
@@ -0,0 +1,32 @@
+"""Add section_version table
+
+Revision ID: 68bd1ed5117d
+Revises: 975f3a3e24fe
+Create Date: 2026-10-19 09:12:40.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '68bd1ed5117d'
+down_revision = '975f3a3e24fe'
+branch_labels = None
+depends_on = None
+
+SECTIONS = ('header', 'banner', 'about', 'why_choose', 'highlights',
+            'services', 'events', 'team', 'contact', 'footer')
+
+
+def upgrade():
+    section_version = op.create_table('section_version',
+    sa.Column('section', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('section')
+    )
+    op.bulk_insert(section_version, [{'section': s, 'version': 1} for s in SECTIONS])
+
+
+def downgrade():
+    op.drop_table('section_version')
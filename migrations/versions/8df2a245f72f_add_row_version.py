@@ -0,0 +1,31 @@
+"""Add row version columns
+
+Revision ID: 8df2a245f72f
+Revises: 40c9c5215777
+Create Date: 2026-10-19 12:41:37.266019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8df2a245f72f'
+down_revision = '40c9c5215777'
+branch_labels = None
+depends_on = None
+
+TABLES = ('header', 'banner', 'about', 'why_choose', 'highlight',
+          'service', 'event', 'team_member', 'contact', 'footer')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
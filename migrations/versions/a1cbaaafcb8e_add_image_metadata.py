@@ -0,0 +1,38 @@
+"""Add image metadata columns
+
+Revision ID: a1cbaaafcb8e
+Revises: 68bd1ed5117d
+Create Date: 2026-10-19 10:03:11.502947
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1cbaaafcb8e'
+down_revision = '68bd1ed5117d'
+branch_labels = None
+depends_on = None
+
+TABLES = ('banner', 'highlight', 'event', 'team_member')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('image_width', sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column('image_height', sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column('image_color', sa.String(length=7), nullable=True))
+            batch_op.add_column(sa.Column('image_placeholder', sa.Text(), nullable=True))
+            batch_op.add_column(sa.Column('image_hash', sa.String(length=16), nullable=True))
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('image_hash')
+            batch_op.drop_column('image_placeholder')
+            batch_op.drop_column('image_color')
+            batch_op.drop_column('image_height')
+            batch_op.drop_column('image_width')
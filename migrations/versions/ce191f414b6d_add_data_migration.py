@@ -0,0 +1,35 @@
+"""Add progress table for batched data migrations
+
+Revision ID: ce191f414b6d
+Revises: e6caa2e23c63
+Create Date: 2026-10-19 17:20:12.530184
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ce191f414b6d'
+down_revision = 'e6caa2e23c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('data_migration',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('position', sa.Text(), nullable=True),
+    sa.Column('batches', sa.Integer(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('data_migration')
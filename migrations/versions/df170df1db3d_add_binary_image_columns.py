@@ -0,0 +1,50 @@
+"""Add binary image columns next to the base64 text ones
+
+Revision ID: df170df1db3d
+Revises: ce191f414b6d
+Create Date: 2026-10-19 19:02:47.113905
+
+"""
+import base64
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'df170df1db3d'
+down_revision = 'ce191f414b6d'
+branch_labels = None
+depends_on = None
+
+# Existing rows are converted afterwards, online, by the `binary_images` data migration
+# (flask run-data-migration binary_images); on Postgres these are catalog-only changes.
+IMAGE_COLUMNS = (('header', 'logo'), ('banner', 'image'), ('about', 'logo'),
+                 ('highlight', 'image'), ('event', 'image'), ('team_member', 'image'))
+
+
+def upgrade():
+    for table, column in IMAGE_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(f'{column}_data', sa.LargeBinary(), nullable=True))
+            batch_op.add_column(sa.Column(f'{column}_mime', sa.String(length=100), nullable=True))
+            batch_op.alter_column(column, existing_type=sa.Text(), nullable=True)
+
+
+def downgrade():
+    # Converted rows would lose their image: write the data URLs back first
+    bind = op.get_bind()
+    for table, column in IMAGE_COLUMNS:
+        rows = sa.table(table, sa.column('id'), sa.column(column), sa.column(f'{column}_data', sa.LargeBinary()),
+                        sa.column(f'{column}_mime'))
+        data, mime = rows.c[f'{column}_data'], rows.c[f'{column}_mime']
+        for id, blob, type_ in bind.execute(sa.select(rows.c.id, data, mime).where(data.is_not(None))).all():
+            value = f"data:{type_};base64,{base64.b64encode(blob).decode('ascii')}"
+            bind.execute(rows.update().where(rows.c.id == id).values({column: value}))
+        bind.execute(rows.update().where(rows.c[column].is_(None)).values({column: ''}))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.Text(), nullable=False)
+            batch_op.drop_column(f'{column}_mime')
+            batch_op.drop_column(f'{column}_data')
+    # Upgrading again converts the rows again
+    bind.execute(sa.text("DELETE FROM data_migration WHERE name = 'binary_images'"))
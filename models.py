@@ -1,27 +1,65 @@
+from sqlalchemy.orm import declared_attr
+
 from extensions import db
 
-class Header(db.Model):
+
+class Versioned:
+    # Row version for optimistic concurrency: ORM flushes check and bump it automatically,
+    # and single-statement PATCH updates bump it explicitly (see _patch_row in app.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {'version_id_col': cls.version}
+
+
+class ChangeTracked:
+    # Stamped on every write (see content_version.py) so the CMS can fetch only rows changed since its last sync
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0, server_default='0', index=True)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+
+class ImageMetadata:
+    # Computed from `image` at upload time so pages can reserve space and show a placeholder
+    image_width = db.Column(db.Integer, nullable=True)
+    image_height = db.Column(db.Integer, nullable=True)
+    image_color = db.Column(db.String(7), nullable=True)  # dominant colour, #rrggbb
+    image_placeholder = db.Column(db.Text, nullable=True)  # tiny blurred JPEG data URL (LQIP)
+    image_hash = db.Column(db.String(16), nullable=True)  # content hash, used in /media URLs
+
+class BinaryImage:
+    # Uploaded images stored decoded (see image_storage.py); `image` keeps external URLs and
+    # values that are not canonical base64 data URLs, and is NULL when the bytes are stored here
+    image_data = db.Column(db.LargeBinary, nullable=True)
+    image_mime = db.Column(db.String(100), nullable=True)
+
+
+class Header(Versioned, ChangeTracked, db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    logo = db.Column(db.Text, nullable=False)
+    logo = db.Column(db.Text, nullable=True)
+    logo_data = db.Column(db.LargeBinary, nullable=True)  # as BinaryImage, for `logo`
+    logo_mime = db.Column(db.String(100), nullable=True)
 
     def __repr__(self):
         return f"<Header {self.id}>"
 
 
-class Banner(db.Model):
+class Banner(Versioned, ChangeTracked, ImageMetadata, BinaryImage, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     subtitle = db.Column(db.String(300), nullable=False)
-    image = db.Column(db.Text, nullable=False) # Storing base64 or URL
+    image = db.Column(db.Text, nullable=True) # URL or non-canonical data URL; see BinaryImage
 
     def __repr__(self):
         return f"<Banner {self.id}: {self.title}>"
 
 
-class About(db.Model):
+class About(Versioned, ChangeTracked, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.Text, nullable=False) # Storing HTML potentially
-    logo = db.Column(db.Text, nullable=False) # Storing base64 or URL
+    logo = db.Column(db.Text, nullable=True) # URL or non-canonical data URL; see BinaryImage
+    logo_data = db.Column(db.LargeBinary, nullable=True)  # as BinaryImage, for `logo`
+    logo_mime = db.Column(db.String(100), nullable=True)
     collaborators = db.Column(db.Integer, nullable=False)
     students = db.Column(db.Integer, nullable=False)
     projects = db.Column(db.Integer, nullable=False)
@@ -31,7 +69,10 @@ class About(db.Model):
         return f"<About {self.id}>"
 
 
-class WhyChoose(db.Model):
+class WhyChoose(Versioned, ChangeTracked, db.Model):
+    # Keyset pages (repository.page) and ordered reads walk (order_id, id) in index order, with no sort
+    __table_args__ = (db.Index('ix_why_choose_order_id_id', 'order_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     icon = db.Column(db.String(50), nullable=False)
@@ -43,9 +84,11 @@ class WhyChoose(db.Model):
         return f"<WhyChoose {self.id}: {self.title}>"
 
 
-class Highlight(db.Model):
+class Highlight(Versioned, ChangeTracked, ImageMetadata, BinaryImage, db.Model):
+    __table_args__ = (db.Index('ix_highlight_order_id_id', 'order_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    image = db.Column(db.Text, nullable=False) # Storing base64 or URL
+    image = db.Column(db.Text, nullable=True) # URL or non-canonical data URL; see BinaryImage
     # Add the order_id column for ordering
     order_id = db.Column(db.Integer, default=0, nullable=False)
 
@@ -53,7 +96,16 @@ class Highlight(db.Model):
         return f"<Highlight {self.id}>"
 
 
-class Service(db.Model):
+class Service(Versioned, ChangeTracked, db.Model):
+    # Regular services are always read filtered on is_additional=False and ordered by order_id,
+    # and the single additional-services row is looked up by is_additional=True.
+    __table_args__ = (
+        db.Index('ix_service_order_id_id_regular', 'order_id', 'id',
+                 postgresql_where=db.text('NOT is_additional'), sqlite_where=db.text('NOT is_additional')),
+        db.Index('ix_service_is_additional', 'is_additional',
+                 postgresql_where=db.text('is_additional'), sqlite_where=db.text('is_additional')),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     # Make title, icon, description nullable for the single 'additional_services' entry
     title = db.Column(db.String(100), nullable=True)
@@ -69,11 +121,13 @@ class Service(db.Model):
         return f"<Service {self.id}: {self.title or 'Additional'}>"
 
 
-class Event(db.Model):
+class Event(Versioned, ChangeTracked, ImageMetadata, BinaryImage, db.Model):
+    __table_args__ = (db.Index('ix_event_order_id_id', 'order_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     year = db.Column(db.String(4), nullable=False)
-    image = db.Column(db.Text, nullable=False) # Storing base64 or URL
+    image = db.Column(db.Text, nullable=True) # URL or non-canonical data URL; see BinaryImage
     # Add the order_id column for ordering
     order_id = db.Column(db.Integer, default=0, nullable=False)
 
@@ -82,12 +136,14 @@ class Event(db.Model):
         return f"<Event {self.id}: {self.title}>"
 
 
-class TeamMember(db.Model):
+class TeamMember(Versioned, ChangeTracked, ImageMetadata, BinaryImage, db.Model):
+    __table_args__ = (db.Index('ix_team_member_order_id_id', 'order_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     title = db.Column(db.String(100), nullable=False)
     bio = db.Column(db.Text, nullable=False)
-    image = db.Column(db.Text, nullable=False) # Storing base64 or URL
+    image = db.Column(db.Text, nullable=True) # URL or non-canonical data URL; see BinaryImage
     # Make social links nullable as they might be optional for some members
     linkedin = db.Column(db.String(500), nullable=True)
     github = db.Column(db.String(500), nullable=True)
@@ -99,7 +155,7 @@ class TeamMember(db.Model):
         return f"<TeamMember {self.id}: {self.name}>"
 
 
-class Contact(db.Model):
+class Contact(Versioned, ChangeTracked, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     location = db.Column(db.String(200), nullable=False)
     email = db.Column(db.String(100), nullable=False)
@@ -109,7 +165,7 @@ class Contact(db.Model):
         return f"<Contact {self.id}>"
 
 
-class Footer(db.Model):
+class Footer(Versioned, ChangeTracked, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     address = db.Column(db.String(200), nullable=False)
     email = db.Column(db.String(100), nullable=False)
@@ -120,4 +176,74 @@ class Footer(db.Model):
     twitter = db.Column(db.String(500), nullable=True)
 
     def __repr__(self):
-        return f"<Footer {self.id}>"
\ No newline at end of file
+        return f"<Footer {self.id}>"
+
+class SectionVersion(db.Model):
+    # One row per homepage section; bumped whenever a row belonging to that section is written
+    section = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<SectionVersion {self.section}: {self.version}>"
+
+
+class ChangeCounter(db.Model):
+    # Single row holding the last change sequence number handed out (see content_version.next_change_seq)
+    id = db.Column(db.Integer, primary_key=True)
+    seq = db.Column(db.BigInteger, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ChangeCounter {self.seq}>"
+
+
+class Tombstone(db.Model):
+    # A deleted content row, kept so delta syncs can tell clients to drop their copy
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # table name of the deleted row
+    row_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.BigInteger, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<Tombstone {self.kind} {self.row_id}>"
+
+
+class Job(db.Model):
+    # Durable background job (see jobs.py); enqueued in the same transaction as the write that needs it
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON keyword arguments for the handler
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime(timezone=True), nullable=False)
+    lease_expires_at = db.Column(db.DateTime(timezone=True), nullable=True)  # a running job is retried after this
+    worker = db.Column(db.String(100), nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
+
+
+class DataMigration(db.Model):
+    # Progress of a batched data migration (see data_migrations.py); updated in each batch's transaction
+    __tablename__ = 'data_migration'
+    name = db.Column(db.String(100), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, paused, done, failed
+    position = db.Column(db.Text, nullable=True)  # JSON key of the last row processed
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<DataMigration {self.name} {self.status}>"
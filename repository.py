@@ -0,0 +1,246 @@
+# repository.py
+# Data access for the site as SQLAlchemy 2.0 statements. Hot reads (homepage sections and CMS
+# list endpoints) use lambda statements: built and compiled once per call site, after which each
+# call only derives a cache key from the lambda's code and closure and reuses the compiled SQL.
+# The *_select builders return the statements the readers below run, which is also what
+# tests/test_query_plans.py EXPLAINs, so the plan check always covers the queries as issued.
+from dataclasses import fields
+from datetime import datetime, timezone
+
+from sqlalchemy import case, func, lambda_stmt, select, tuple_, update
+
+from content_version import next_change_seq
+from extensions import db
+from image_storage import IMAGE_FIELDS, stored_image
+from models import ChangeCounter, Service, Tombstone
+
+
+# --- Single rows ---
+def get(model, id):
+    """Primary-key lookup through the identity map (no query when the row is already loaded)."""
+    return db.session.get(model, id)
+
+
+def image_select(model, id):
+    """The stored image columns and content hash of one row, as the /media route reads them."""
+    return select(model.image, model.image_data, model.image_mime, model.image_hash).where(model.id == id)
+
+
+def image_row(model, id):
+    return db.session.execute(image_select(model, id)).first()
+
+
+# --- View objects (dto.py) ---
+_view_statements = {}
+
+
+def _view_select(view, full_image):
+    """SELECT of exactly the view's fields, built once per view type and reused.
+
+    Returns (statement, index of the field whose stored bytes are selected as the last two columns, or None).
+    """
+    key = (view, full_image)
+    entry = _view_statements.get(key)
+    if entry is None:
+        model = view.model
+        columns, binary, index = [], [], None
+        for i, field in enumerate(fields(view)):
+            column = getattr(model, field.name)
+            if field.name == 'image' and not full_image:
+                column = case((model.image_hash.is_(None), model.image)).label('image')
+            elif field.name == IMAGE_FIELDS.get(model):
+                index = i
+                binary = [getattr(model, f'{field.name}_data'), getattr(model, f'{field.name}_mime')]
+            columns.append(column)
+        entry = _view_statements[key] = (select(*columns, *binary), index)
+    return entry
+
+
+def _view(view, row, index):
+    if index is None:
+        return view(*row)
+    values = list(row[:-2])
+    values[index] = stored_image(values[index], row[-2], row[-1])
+    return view(*values)
+
+
+def first_view_select(view, *criteria, full_image=False):
+    stmt, index = _view_select(view, full_image)
+    return stmt.where(*criteria).limit(1), index
+
+
+def first_view(view, *criteria, full_image=False):
+    """The singleton row of view.model as a view object, or None."""
+    stmt, index = first_view_select(view, *criteria, full_image=full_image)
+    row = db.session.execute(stmt).first()
+    return _view(view, row, index) if row is not None else None
+
+
+def ordered_views_select(view, *criteria):
+    stmt, index = _view_select(view, False)
+    return stmt.where(*criteria).order_by(view.model.order_id), index
+
+
+def ordered_views(view, *criteria):
+    """An ordered collection as view objects, in display order."""
+    stmt, index = ordered_views_select(view, *criteria)
+    return [_view(view, row, index) for row in db.session.execute(stmt)]
+
+
+# --- Ordered collections ---
+def ordered(model):
+    """All rows of an ordered collection in display order (as ORM objects, for reordering)."""
+    return db.session.scalars(lambda_stmt(lambda: select(model).order_by(model.order_id))).all()
+
+
+class StreamedRows:
+    """Rows read from a server-side cursor on a connection of their own.
+
+    Flask-SQLAlchemy closes the request's session when the view's app context is popped, which
+    happens before a streamed body is sent (stream_with_context only restores the request context),
+    so a cursor opened through the session would be gone by then. close() releases the connection.
+    """
+
+    def __init__(self, connection, result):
+        self.connection = connection
+        self.result = result
+
+    def __iter__(self):
+        return iter(self.result)
+
+    def close(self):
+        self.result.close()
+        self.connection.close()
+
+
+def page_select(model, columns, *criteria, after=None, limit=None):
+    stmt = select(*columns).where(*criteria).order_by(model.order_id, model.id)
+    if after is not None:
+        stmt = stmt.where(tuple_(model.order_id, model.id) > tuple_(*after))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def page(model, columns, *criteria, after=None, limit=None, yield_per=100):
+    """Selected columns of an ordered collection, keyset-paginated on (order_id, id), as StreamedRows.
+
+    `after` is the (order_id, id) of the last row already seen. Rows are fetched `yield_per` at a
+    time, so iterating never holds the whole collection. The statement runs before this returns
+    (on the replica when the request reads from it), so connection errors surface in the view.
+
+    The request's session is closed first, handing its connection back to the pool: with a pool of
+    one connection (serverless) the cursor's connection would otherwise wait for it until timing out.
+    Call this after the view's last use of the session.
+    """
+    stmt = page_select(model, columns, *criteria, after=after, limit=limit)
+    engine = db.session.get_bind(clause=stmt)
+    db.session.close()
+    connection = engine.connect()
+    try:
+        result = connection.execution_options(yield_per=yield_per).execute(stmt)
+    except Exception:
+        connection.close()
+        raise
+    return StreamedRows(connection, result)
+
+
+def regular_services():
+    return db.session.scalars(lambda_stmt(
+        lambda: select(Service).where(~Service.is_additional).order_by(Service.order_id)
+    )).all()
+
+
+def next_order_id(model):
+    """order_id for a row appended to the end of a collection."""
+    if model is Service:
+        stmt = lambda_stmt(lambda: select(func.max(Service.order_id)).where(~Service.is_additional))
+    else:
+        stmt = lambda_stmt(lambda: select(func.max(model.order_id)))
+    return (db.session.scalar(stmt) or 0) + 1
+
+
+def items_after(model, order_id):
+    """Rows ordered after order_id (the ones that shift up when a row is deleted)."""
+    if model is Service:
+        stmt = select(Service).where(~Service.is_additional, Service.order_id > order_id)
+    else:
+        stmt = select(model).where(model.order_id > order_id)
+    return db.session.scalars(stmt.order_by(model.order_id)).all()
+
+
+# --- Delta sync ---
+def change_seq():
+    """The last change sequence number handed out (0 before the first write)."""
+    return db.session.scalar(select(ChangeCounter.seq).where(ChangeCounter.id == 1)) or 0
+
+
+def changed_select(model, since):
+    """SELECT for changed_since: the row's columns without the derived image_* metadata, with the
+    stored image bytes and type (if any) last."""
+    field = IMAGE_FIELDS.get(model)
+    binary = (f'{field}_data', f'{field}_mime') if field else ()
+    columns = [column for column in model.__table__.columns
+               if not column.key.startswith('image_') and column.key not in binary]
+    stmt = select(*columns, *(model.__table__.c[name] for name in binary)).order_by(model.change_seq, model.id)
+    if since:
+        stmt = stmt.where(model.change_seq > since)
+    return stmt
+
+
+def changed_since(model, since):
+    """Rows of model written after change sequence `since` (every row when since is 0), as dicts.
+
+    The derived image_* metadata columns are left out; clients get the image itself.
+    """
+    field = IMAGE_FIELDS.get(model)
+    binary = (f'{field}_data', f'{field}_mime') if field else ()
+    stmt = changed_select(model, since)
+    rows = []
+    for row in db.session.execute(stmt):
+        values = dict(row._mapping)
+        if field:
+            values[field] = stored_image(values[field], values.pop(binary[0]), values.pop(binary[1]))
+        rows.append(values)
+    return rows
+
+
+def deleted_select(since):
+    return select(Tombstone.kind, Tombstone.row_id).where(Tombstone.change_seq > since).order_by(Tombstone.change_seq)
+
+
+def deleted_since(since):
+    return db.session.execute(deleted_select(since)).all()
+
+
+# --- Writes ---
+def singleton(model, *criteria):
+    """WHERE criterion selecting the single row of a one-row table without loading it."""
+    return model.id == select(func.min(model.id)).where(*criteria).scalar_subquery()
+
+
+def patch(model, values, *criteria):
+    """UPDATE only `values` on the row matching criteria and bump its version, in one statement.
+
+    Returns the (id, version) row, or None when nothing matched. With no values the row is only
+    looked up, so an empty PATCH doesn't invalidate anything.
+    """
+    if not values:
+        return db.session.execute(select(model.id, model.version).where(*criteria)).first()
+    stmt = patch_update(model, values, next_change_seq(db.session.connection()), *criteria)
+    return db.session.execute(stmt, execution_options={"synchronize_session": False}).first()
+
+
+def patch_update(model, values, change_seq, *criteria):
+    """The UPDATE ... RETURNING patch runs, stamped with change sequence `change_seq`."""
+    return (update(model).where(*criteria)
+            .values(**values, version=model.version + 1, change_seq=change_seq, updated_at=datetime.now(timezone.utc))
+            .returning(model.id, model.version))
+
+
+def set_derived(model, values, *criteria):
+    """UPDATE values computed from the row's own content (e.g. image metadata) without bumping its
+    version, so an editor's If-Match stays valid. The change sequence and section version still advance."""
+    stmt = (update(model).where(*criteria)
+            .values(**values, change_seq=next_change_seq(db.session.connection()), updated_at=datetime.now(timezone.utc)))
+    db.session.execute(stmt, execution_options={"synchronize_session": False})
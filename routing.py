@@ -0,0 +1,74 @@
+# routing.py
+import os
+import time
+from functools import wraps
+
+from flask import g, request
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+
+REPLICA_BIND = 'replica'
+# After a failed replica connection, send reads to the primary for this long
+REPLICA_RETRY_AFTER = int(os.getenv('REPLICA_RETRY_AFTER', '30'))
+# After a CMS write, the editor's reads stay on the primary for this long (read-your-writes)
+READ_YOUR_WRITES_WINDOW = int(os.getenv('READ_YOUR_WRITES_WINDOW', '15'))
+PRIMARY_COOKIE = 'db_primary_until'
+
+_replica_down_until = 0.0
+
+
+def replica_configured():
+    try:
+        return REPLICA_BIND in db.engines
+    except RuntimeError:  # db was never initialised on this app (no database configured)
+        return False
+
+
+def _recently_wrote():
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _replica_usable():
+    return replica_configured() and time.monotonic() >= _replica_down_until and not _recently_wrote()
+
+
+def run_on_replica(fn):
+    """Run fn with SELECTs routed to the replica, retrying once on the primary if the replica fails."""
+    global _replica_down_until
+    if not _replica_usable():
+        return fn()
+    g.use_replica = True
+    try:
+        return fn()
+    except OperationalError as e:
+        print(f"Read replica unavailable, failing over to primary for {REPLICA_RETRY_AFTER}s: {e}")
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_AFTER
+        db.session.rollback()
+        g.use_replica = False
+        return fn()
+    finally:
+        g.use_replica = False
+
+
+def replica_reads(f):
+    """Decorator form of run_on_replica for read-only views."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        return run_on_replica(lambda: f(*args, **kwargs))
+    return decorated_function
+
+
+def mark_primary_reads(response):
+    """after_request hook: pin the client's reads to the primary for a while after a successful content
+    write. Only CMS API writes count: every homepage load POSTs the /visit beacon, and pinning its
+    anonymous visitors would send their next page loads to the primary."""
+    if (request.path.startswith('/api/') and request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+            and response.status_code < 400 and replica_configured()):
+        expires_at = time.time() + READ_YOUR_WRITES_WINDOW
+        response.set_cookie(PRIMARY_COOKIE, f"{expires_at:.0f}", max_age=READ_YOUR_WRITES_WINDOW,
+                            httponly=True, secure=True, samesite='Lax')
+    return response
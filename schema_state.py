@@ -0,0 +1,181 @@
+# schema_state.py
+import hashlib
+import json
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+
+import click
+from alembic import command
+from alembic.script import ScriptDirectory
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from cache import cache
+from extensions import db
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Written at build time by `flask upgrade-schema` and shipped with the bundle: which migrations the
+# build applied to which database. Instances started from that build skip the revision check entirely.
+SCHEMA_STATE_FILE = os.getenv('SCHEMA_STATE_FILE', os.path.join(BASE_DIR, 'build', 'schema_state.json'))
+# Upgrade a database found behind at startup (off: log a warning; the build step migrates)
+MIGRATE_ON_START = os.getenv('MIGRATE_ON_START', '0') == '1'
+# A matching revision is remembered in the cache this long, shared by every instance using the cache
+SCHEMA_CHECK_TTL = int(os.getenv('SCHEMA_CHECK_TTL', '3600'))
+
+UPGRADE_LOCK = 'alembic-upgrade'
+
+
+# --- Advisory Locks ---
+def lock_key(name):
+    """Stable 32-bit key for a pg advisory lock taken under this name."""
+    return zlib.crc32(f"brainycube:{name}".encode('utf-8'))
+
+
+@contextmanager
+def advisory_lock(connection, name, wait=True):
+    """Hold a session-level Postgres advisory lock on `connection` for the block; yields whether it was taken.
+
+    Other databases have no cross-process locks and always get True (a content file has one writer anyway).
+    """
+    if connection.dialect.name != 'postgresql':
+        yield True
+        return
+    key = lock_key(name)
+    if wait:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+        locked = True
+    else:
+        locked = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+    connection.commit()  # the lock is session-level; don't leave the connection inside a transaction
+    try:
+        yield locked
+    finally:
+        if locked:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+            connection.commit()
+
+
+# --- Revisions ---
+def code_head():
+    """The head revision of the migrations shipped with this code."""
+    config = current_app.extensions['migrate'].migrate.get_config()
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def database_id():
+    """Short fingerprint of the configured database (password excluded), to tell builds' targets apart."""
+    url = db.engine.url.render_as_string(hide_password=True)
+    target = f"{url}|{os.getenv('INSTANCE_CONNECTION_NAME', '')}|{os.getenv('DB_NAME', '')}"
+    return hashlib.sha1(target.encode('utf-8')).hexdigest()[:12]
+
+
+def database_revision(connection):
+    """The revision stamped in alembic_version (None for a database that was never migrated)."""
+    try:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except SQLAlchemyError:
+        connection.rollback()
+        return None
+
+
+def _migrations_fingerprint():
+    """sha1 of the revision file names: changes whenever a migration is added, without parsing any."""
+    versions = os.path.join(BASE_DIR, 'migrations', 'versions')
+    names = sorted(name for name in os.listdir(versions) if name.endswith('.py'))
+    return hashlib.sha1('\n'.join(names).encode('utf-8')).hexdigest()
+
+
+def schema_recorded():
+    """True when the build recorded upgrading this database with these migrations."""
+    try:
+        with open(SCHEMA_STATE_FILE) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return state.get('migrations') == _migrations_fingerprint() and state.get('database') == database_id()
+
+
+def record_schema_state():
+    """Record that this database is at head for these migrations; False where the bundle is read-only."""
+    try:
+        os.makedirs(os.path.dirname(SCHEMA_STATE_FILE), exist_ok=True)
+        with open(SCHEMA_STATE_FILE, 'w') as f:
+            json.dump({"head": code_head(), "migrations": _migrations_fingerprint(), "database": database_id()},
+                      f, indent=2, sort_keys=True)
+    except OSError as e:
+        print(f"Warning: could not record schema state in {SCHEMA_STATE_FILE}: {e}")
+        return False
+    return True
+
+
+def _checked_key():
+    return f"{database_id()}:{_migrations_fingerprint()}"
+
+
+def upgrade_to_head():
+    """Upgrade the database to head unless it already is, with one instance migrating at a time.
+
+    Returns the revision the database was at before.
+    """
+    head = code_head()
+    with db.engine.connect() as connection, advisory_lock(connection, UPGRADE_LOCK):
+        # Re-read under the lock: another instance may have just finished the same upgrade
+        before = database_revision(connection)
+        connection.commit()
+        if before != head:
+            print(f"Upgrading database schema {before} -> {head}")
+            config = current_app.extensions['migrate'].migrate.get_config()
+            config.attributes['connection'] = connection
+            command.upgrade(config, 'head')
+    cache.set('schema', _checked_key(), True, ttl=SCHEMA_CHECK_TTL)
+    return before
+
+
+# --- Startup Check ---
+_checked = False
+_check_lock = threading.Lock()
+
+
+def check_schema(can_migrate=True):
+    """Compare the database's revision with the code's head, once per process.
+
+    A file read when the build recorded upgrading this database with these migrations, a cache lookup
+    when an instance recently saw it at head, one SELECT otherwise. A database that is behind is
+    upgraded (MIGRATE_ON_START=1, under the upgrade lock) or reported.
+    """
+    global _checked
+    if _checked:
+        return
+    with _check_lock:
+        if _checked:
+            return
+        if schema_recorded() or cache.get('schema', _checked_key()):
+            _checked = True
+            return
+        head = code_head()
+        with db.engine.connect() as connection:
+            revision = database_revision(connection)
+        if revision == head:
+            cache.set('schema', _checked_key(), True, ttl=SCHEMA_CHECK_TTL)
+        elif MIGRATE_ON_START and can_migrate:
+            upgrade_to_head()
+        else:
+            print(f"Warning: database schema is at {revision}, this code expects {head}. "
+                  f"Run 'flask upgrade-schema' (or set MIGRATE_ON_START=1).")
+        _checked = True
+
+
+@click.command('upgrade-schema')
+@click.option('--record/--no-record', default=True, show_default=True,
+              help=f'Write {os.path.relpath(SCHEMA_STATE_FILE, BASE_DIR)} so instances of this build skip the startup check.')
+def upgrade_schema_command(record):
+    """Upgrade the database to head under the migration lock (the build step)."""
+    before = upgrade_to_head()
+    head = code_head()
+    click.echo(f"Database schema at {head}" + (f" (was {before})." if before != head else " (already current)."))
+    if record and record_schema_state():
+        click.echo(f"Recorded schema state in {SCHEMA_STATE_FILE}")
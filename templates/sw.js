@@ -0,0 +1,85 @@
+// Service worker for the public site, rendered by the /sw.js route. VERSION is the content version
+// the precache list was built from; editing the site changes it, which makes browsers install a new
+// worker that precaches the new homepage, its assets and the banner image. Other images are cached
+// as pages load them (lazily, for the carousel), in a cache that outlives worker versions.
+const VERSION = {{ version|tojson }};
+const CACHE = 'brainycube-' + VERSION;
+const MEDIA_CACHE = 'brainycube-media';
+const PRECACHE = {{ precache|tojson }};
+
+// Immutable by URL: content-hashed /media images and versioned stylesheets/fonts
+function isCacheFirst(url) {
+  return (url.origin === self.location.origin && url.pathname.startsWith('/media/')) ||
+         url.hostname === 'cdnjs.cloudflare.com';
+}
+
+async function precache() {
+  const cache = await caches.open(CACHE);
+  await Promise.all(PRECACHE.map(async (path) => {
+    // Reuse what an older worker already cached (media URLs never change content)
+    const cached = await caches.match(path);
+    if (cached && path !== '/') return cache.put(path, cached);
+    try {
+      const sameOrigin = new URL(path, self.location.href).origin === self.location.origin;
+      const response = await fetch(path, { cache: 'no-cache', mode: sameOrigin ? 'same-origin' : 'no-cors' });
+      if (response.ok || response.type === 'opaque') await cache.put(path, response);
+    } catch (e) {
+      console.warn('Precache failed for', path, e);
+    }
+  }));
+}
+
+self.addEventListener('install', (event) => {
+  event.waitUntil(precache().then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil((async () => {
+    const names = await caches.keys();
+    await Promise.all(names.filter((name) => name.startsWith('brainycube-') && name !== CACHE && name !== MEDIA_CACHE)
+                           .map((name) => caches.delete(name)));
+    await self.clients.claim();
+  })());
+});
+
+async function cacheFirst(request) {
+  const cached = await caches.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok || response.type === 'opaque') {
+    // Content-hashed media URLs stay valid across content versions; other assets follow the worker
+    const sameOrigin = new URL(request.url).origin === self.location.origin;
+    const cache = await caches.open(sameOrigin ? MEDIA_CACHE : CACHE);
+    cache.put(request, response.clone());
+  }
+  return response;
+}
+
+async function staleWhileRevalidate(event, key) {
+  const cache = await caches.open(CACHE);
+  const cached = await cache.match(key);
+  const network = fetch(event.request).then((response) => {
+    if (response.ok || response.type === 'opaque') cache.put(key, response.clone());
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(network.catch(() => {}));
+    return cached;
+  }
+  return network;
+}
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+
+  if (request.mode === 'navigate' && url.origin === self.location.origin && url.pathname === '/') {
+    event.respondWith(staleWhileRevalidate(event, '/'));
+  } else if (isCacheFirst(url)) {
+    event.respondWith(cacheFirst(request));
+  } else if (url.hostname === 'cdn.tailwindcss.com') {
+    event.respondWith(staleWhileRevalidate(event, request));
+  }
+  // Everything else (CMS, API, login) goes to the network untouched
+});
@@ -0,0 +1,84 @@
+# templating.py
+import hashlib
+import json
+import os
+import shutil
+
+import click
+from jinja2 import ChoiceLoader, FileSystemBytecodeCache, ModuleLoader
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bytecode cache lives in /tmp (the only writable path on serverless instances).
+BYTECODE_CACHE_DIR = os.getenv('JINJA_BYTECODE_CACHE_DIR', '/tmp/jinja_bytecode')
+# Precompiled template modules are produced at build time and shipped with the bundle: vercel.json's
+# buildCommand runs `flask compile-templates` and includeFiles keeps the (gitignored) build/ directory
+# in the function. Deploying any other way, run the command before packaging; without its output every
+# instance compiles the templates from source on first use.
+COMPILED_TEMPLATES_DIR = os.getenv('JINJA_COMPILED_DIR', os.path.join(BASE_DIR, 'build', 'templates_compiled'))
+MANIFEST_NAME = 'manifest.json'
+
+
+def _template_fingerprints(app):
+    """Return {template name: sha1 of source} for every template the app can load."""
+    fingerprints = {}
+    loader = app.jinja_env.loader
+    for name in app.jinja_env.list_templates():
+        source, _, _ = loader.get_source(app.jinja_env, name)
+        fingerprints[name] = hashlib.sha1(source.encode('utf-8')).hexdigest()
+    return fingerprints
+
+
+def _compiled_templates_current(app):
+    """True when the precompiled modules were built from the templates on disk."""
+    manifest_path = os.path.join(COMPILED_TEMPLATES_DIR, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest == _template_fingerprints(app)
+
+
+def init_templating(app):
+    """Attach the persistent bytecode cache and, if present and current, the precompiled templates."""
+    try:
+        os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(BYTECODE_CACHE_DIR)
+        print(f"Jinja bytecode cache enabled at {BYTECODE_CACHE_DIR}")
+    except OSError as e:
+        print(f"Warning: Jinja bytecode cache disabled: {e}")
+
+    if app.debug or not os.path.isdir(COMPILED_TEMPLATES_DIR):
+        return
+    if not _compiled_templates_current(app):
+        print("Warning: precompiled templates are stale; run 'flask compile-templates'. Using template sources.")
+        return
+    app.jinja_env.loader = ChoiceLoader([ModuleLoader(COMPILED_TEMPLATES_DIR), app.jinja_env.loader])
+    print(f"Precompiled templates loaded from {COMPILED_TEMPLATES_DIR}")
+
+
+@click.command('compile-templates')
+@click.option('--target', default=COMPILED_TEMPLATES_DIR, show_default=True,
+              help='Directory to write the compiled template modules to.')
+def compile_templates_command(target):
+    """Precompile all templates into importable modules and seed the bytecode cache."""
+    from flask import current_app
+
+    app = current_app._get_current_object()
+    # Always compile from the sources, never from a previous build.
+    env = app.jinja_env
+    if isinstance(env.loader, ChoiceLoader):
+        env.loader = env.loader.loaders[-1]
+
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.makedirs(target)
+    env.compile_templates(target, zip=None, log_function=click.echo, ignore_errors=False)
+    with open(os.path.join(target, MANIFEST_NAME), 'w') as f:
+        json.dump(_template_fingerprints(app), f, indent=2, sort_keys=True)
+
+    # Loading each template through the environment writes its bytecode to the cache dir.
+    for name in env.list_templates():
+        env.get_template(name)
+    click.echo(f"Compiled {len(env.list_templates())} templates into {target}")
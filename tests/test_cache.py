@@ -0,0 +1,215 @@
+# tests/test_cache.py
+# The cache tiers (cache.py) and SingleFlight, with RedisCache talking to a small in-process
+# stand-in that speaks the subset of RESP2 it uses (GET, PTTL, SET [PX], DEL, INCR).
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from cache import Cache, MemoryCache, RedisCache
+from singleflight import SingleFlight, SingleFlightTimeout
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _reply(self, value):
+        if value is None:
+            self.wfile.write(b'$-1\r\n')
+        elif isinstance(value, int):
+            self.wfile.write(b':%d\r\n' % value)
+        elif value == b'OK':
+            self.wfile.write(b'+OK\r\n')
+        else:
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(value), value))
+
+    def handle(self):
+        store, lock = self.server.store, self.server.lock
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            command, key, now = args[0].upper(), args[1], time.monotonic()
+            with lock:
+                entry = store.get(key)
+                if entry is not None and entry[1] is not None and entry[1] <= now:
+                    del store[key]
+                    entry = None
+                if command == b'GET':
+                    reply = entry[0] if entry else None
+                elif command == b'PTTL':
+                    reply = -2 if entry is None else -1 if entry[1] is None else int((entry[1] - now) * 1000)
+                elif command == b'SET':
+                    expires_at = now + int(args[4]) / 1000 if len(args) > 3 and args[3].upper() == b'PX' else None
+                    store[key] = (args[2], expires_at)
+                    reply = b'OK'
+                elif command == b'DEL':
+                    reply = int(store.pop(key, None) is not None)
+                elif command == b'INCR':
+                    reply = int(entry[0]) + 1 if entry else 1
+                    store[key] = (str(reply).encode(), None)
+                else:
+                    self.wfile.write(b'-ERR unknown command\r\n')
+                    continue
+            self._reply(reply)
+
+
+@pytest.fixture(scope='module')
+def resp_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _RespHandler)
+    server.daemon_threads = True
+    server.store, server.lock = {}, threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def redis_url(resp_server):
+    resp_server.store.clear()
+    return f"redis://127.0.0.1:{resp_server.server_address[1]}"
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# --- RedisCache ---
+def test_redis_get_set_delete_incr(redis_url):
+    redis = RedisCache(redis_url)
+    assert redis.get('k') is None
+    redis.set('k', b'\x00binary\r\nvalue')
+    assert redis.get('k') == b'\x00binary\r\nvalue'
+    assert redis.get_with_ttl('k') == (b'\x00binary\r\nvalue', None)
+    redis.delete('k')
+    assert redis.get_with_ttl('k') == (None, None)
+    assert [redis.incr('n') for _ in range(3)] == [1, 2, 3]
+    assert redis.stats()['errors'] == 0
+
+
+def test_redis_ttl(redis_url):
+    redis = RedisCache(redis_url)
+    redis.set('k', b'v', ttl=0.3)
+    value, ttl = redis.get_with_ttl('k')
+    assert value == b'v' and 0 < ttl <= 0.3
+    time.sleep(0.35)
+    assert redis.get('k') is None
+
+
+def test_redis_unreachable_is_a_miss():
+    redis = RedisCache(f"redis://127.0.0.1:{_closed_port()}", timeout=0.2, retry_after=60)
+    assert redis.get('k') is None
+    redis.set('k', b'v')  # not even attempted: the server is left alone for retry_after
+    assert redis.get_with_ttl('k') == (None, None)
+    assert redis.stats()['errors'] == 1
+
+
+# --- Cache ---
+def test_namespaced_values_round_trip(redis_url):
+    cache = Cache([MemoryCache(1 << 20), RedisCache(redis_url)])
+    cache.set('page', 'home', {'html': '<p>hi</p>'})
+    assert cache.get('page', 'home') == {'html': '<p>hi</p>'}
+    assert cache.get('fragment', 'home') is None
+    assert cache.get_or_set('page', 'other', lambda: [1, 2]) == [1, 2]
+    assert cache.get_or_set('page', 'other', lambda: pytest.fail("computed twice")) == [1, 2]
+
+
+def test_invalidate_bumps_the_generation_for_every_instance(redis_url):
+    first = Cache([MemoryCache(1 << 20), RedisCache(redis_url)], generation_ttl=0)
+    second = Cache([MemoryCache(1 << 20), RedisCache(redis_url)], generation_ttl=0)
+    first.set('page', 'home', 'old')
+    first.set('fragment', 'team', 'kept')
+    assert second.get('page', 'home') == 'old'  # now in second's memory tier too
+    first.invalidate('page')
+    assert second.get('page', 'home') is None
+    assert first.get('page', 'home') is None
+    assert second.get('fragment', 'team') == 'kept'
+    second.set('page', 'home', 'new')
+    assert first.get('page', 'home') == 'new'
+
+
+def test_backfill_keeps_the_remaining_ttl(redis_url):
+    writer = Cache([RedisCache(redis_url)])
+    memory = MemoryCache(1 << 20)
+    reader = Cache([memory, RedisCache(redis_url)])
+    writer.set('auth', 'token', 'session', ttl=0.3)
+    writer.set('page', 'home', 'forever')
+    assert reader.get('auth', 'token') == 'session'
+    assert reader.get('page', 'home') == 'forever'
+    expiry = {key.split(':')[1]: expires_at for key, (_, expires_at) in memory._entries.items()}
+    assert expiry['auth'] - time.monotonic() <= 0.3 and expiry['page'] is None
+    time.sleep(0.35)
+    assert reader.get('auth', 'token') is None  # the backfilled copy expired with the original
+    assert reader.get('page', 'home') == 'forever'
+
+
+def test_backfill_from_an_unreachable_tier_is_a_miss():
+    cache = Cache([MemoryCache(1 << 20), RedisCache(f"redis://127.0.0.1:{_closed_port()}", timeout=0.2)])
+    assert cache.get('page', 'home') is None
+    cache.set('page', 'home', 'local')
+    assert cache.get('page', 'home') == 'local'
+
+
+# --- SingleFlight ---
+def _run_concurrently(count, target):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_singleflight_runs_concurrent_calls_once():
+    flight, calls = SingleFlight(), []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'page'
+
+    results, errors = _run_concurrently(8, lambda: flight.do('home', build))
+    assert calls == [1] and results == ['page'] * 8 and not errors
+    assert flight.do('home', lambda: 'again') == 'again'  # nothing in flight any more
+
+
+def test_singleflight_shares_the_leaders_error():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("render failed")
+
+    results, errors = _run_concurrently(4, lambda: flight.do('home', fail))
+    assert not results and len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+
+
+def test_singleflight_followers_time_out():
+    flight, started = SingleFlight(), threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.5)
+        return 'page'
+
+    leader = threading.Thread(target=flight.do, args=('home', slow))
+    leader.start()
+    started.wait()
+    with pytest.raises(SingleFlightTimeout):
+        flight.do('home', lambda: 'follower', timeout=0.05)
+    leader.join()
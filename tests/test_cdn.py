@@ -0,0 +1,104 @@
+# tests/test_cdn.py
+# CDN headers and the purge webhook (cdn.py), with PurgeQueue posting to a local HTTP stub.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from flask import Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import cdn
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.headers.get('Authorization'), body['surrogate_keys']))
+            failing = server.failures > 0
+            server.failures -= failing
+        self.send_response(503 if failing else 200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _WebhookHandler)
+    server.requests, server.failures, server.lock = [], 0, threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(cdn, 'PURGE_WEBHOOK_URL', f"http://127.0.0.1:{server.server_port}/purge")
+    monkeypatch.setattr(cdn, 'PURGE_WEBHOOK_TOKEN', 's3cret')
+    monkeypatch.setattr(cdn, 'PURGE_RETRY_BACKOFF', 0.01)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+# --- Headers ---
+def test_homepage_is_tagged_with_every_section():
+    response = cdn.cache_homepage(Response('page'), ['header', 'team'])
+    assert response.headers['Surrogate-Key'] == 'homepage section-header section-team'
+    assert response.headers['Cache-Tag'] == 'homepage,section-header,section-team'
+    assert 's-maxage=' in response.headers['Cache-Control']
+    assert cdn.keep_private(Response('page')).headers['Cache-Control'] == 'private, no-store'
+
+
+def test_media_is_tagged_with_its_row():
+    response = cdn.tag_media(Response(b''), 'team_member', 3)
+    assert response.headers['Surrogate-Key'] == 'media media-team_member-3'
+    assert response.headers['Cache-Tag'] == 'media,media-team_member-3'
+
+
+# --- Purging ---
+def test_writes_within_the_debounce_window_are_purged_together(webhook):
+    queue = cdn.PurgeQueue(cdn._post_purge, 0.2)
+    queue.add(['section-team'])
+    queue.add(['section-events', 'media-event-2'])
+    queue.add(['section-team'])
+    assert webhook.requests == []
+    time.sleep(0.5)
+    assert webhook.requests == [('Bearer s3cret', ['media-event-2', 'section-events', 'section-team'])]
+
+
+def test_failed_purge_is_retried_inline_without_debounce(webhook):
+    webhook.failures = 2
+    cdn.PurgeQueue(cdn._post_purge, 0).add(['section-team'])
+    # add() returns once the batch went through: nothing is left to a thread that may be frozen
+    assert [keys for _, keys in webhook.requests] == [['section-team']] * 3
+
+
+def test_inline_retries_are_bounded(webhook):
+    webhook.failures = 10
+    queue = cdn.PurgeQueue(cdn._post_purge, 0)
+    queue.add(['section-team'])
+    queue.add(['section-footer'])  # a new batch gets its own attempts
+    assert [keys for _, keys in webhook.requests] == (
+        [['section-team']] * cdn.PURGE_RETRIES + [['section-footer']] * cdn.PURGE_RETRIES)
+
+
+def test_debounced_retry_resends_the_failed_batch(webhook):
+    webhook.failures = 1
+    cdn.PurgeQueue(cdn._post_purge, 0.1).add(['section-team'])
+    time.sleep(0.5)
+    assert [keys for _, keys in webhook.requests] == [['section-team'], ['section-team']]
+
+
+def test_commit_purges_changed_sections_and_deleted_media(webhook, monkeypatch):
+    monkeypatch.setattr(cdn, 'purge_queue', cdn.PurgeQueue(cdn._post_purge, 0))
+    with Session(create_engine('sqlite://')) as session:
+        session.execute(text('SELECT 1'))
+        session.info['changed_sections'] = {'events'}
+        session.info['deleted_rows'] = [('event', 2)]
+        session.commit()
+        session.execute(text('SELECT 1'))
+        session.info['changed_sections'] = {'team'}
+        session.rollback()  # rolled-back changes purge nothing
+        session.commit()
+    assert webhook.requests == [('Bearer s3cret', ['media-event-2', 'section-events'])]
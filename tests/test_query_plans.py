@@ -0,0 +1,168 @@
+# tests/test_query_plans.py
+# EXPLAINs the statements behind index(), the CMS API and the job runner against a local PostgreSQL
+# database and fails when one sequentially scans a table that has grown. The statements come from the
+# builders the code itself runs (repository.py, jobs.claim_update), so the check can't drift from the
+# queries actually issued. The migrations (when the database is behind) and the seeded rows run in one
+# transaction that is rolled back, but they still run: the database is never DATABASE_URL (nor
+# .env's), only a dedicated TEST_DATABASE_URL on this machine, e.g.
+#   TEST_DATABASE_URL=postgresql://postgres@localhost/plans_test pytest
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.engine import make_url
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL', '')
+if not TEST_DATABASE_URL.startswith(('postgres://', 'postgresql')):
+    pytest.skip("query plans are checked against a PostgreSQL TEST_DATABASE_URL", allow_module_level=True)
+
+# A unix socket directory or a loopback address: anything else may be a shared or production server
+LOCAL_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+_url = make_url(TEST_DATABASE_URL.replace('postgres://', 'postgresql://', 1))
+_socket = _url.query.get('host', '')
+if (_url.host or '') not in LOCAL_HOSTS or (_socket and not str(_socket).startswith('/')):
+    pytest.fail(f"refusing to migrate and seed {_url.render_as_string()}: TEST_DATABASE_URL must be a local "
+                "database", pytrace=False)
+
+# app.py configures itself from the environment at import: point every database setting at the test
+# database (load_dotenv doesn't override variables that are already set)
+os.environ.update(DATABASE_URL=TEST_DATABASE_URL, DATABASE_REPLICA_URL='', INSTANCE_CONNECTION_NAME='',
+                  CONTENT_FILE='', ALLOW_NO_DB='0')
+
+from alembic import command
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import repository
+from app import app
+from dto import (HeaderView, BannerView, AboutView, WhyChooseView, HighlightView, ServiceView,
+                 AdditionalServicesView, EventView, TeamMemberView, ContactView, FooterView)
+from extensions import db
+from jobs import claim_update
+from models import (Header, Banner, About, WhyChoose, Highlight, Service, Event, TeamMember, Contact, Footer,
+                    Job, Tombstone)
+
+# Rows seeded into each growing table; any Seq Scan on one of them is a regression
+SEED_ROWS = 5000
+ORDERED_VIEWS = {WhyChoose: WhyChooseView, Highlight: HighlightView, Service: ServiceView, Event: EventView,
+                 TeamMember: TeamMemberView}
+SINGLETON_VIEWS = {Header: HeaderView, Banner: BannerView, About: AboutView, Contact: ContactView,
+                   Footer: FooterView}
+# A column each singleton's PATCH sets
+PATCHED_FIELDS = {Header: 'logo', Banner: 'title', About: 'description', Contact: 'email', Footer: 'email'}
+MEDIA_MODELS = (Banner, Highlight, Event, TeamMember)
+# Values for the NOT NULL columns of the ordered tables
+SEED_VALUES = {'title': 'seed', 'icon': 'fa-seedling', 'description': '', 'image': '', 'year': '2024',
+               'name': 'seed', 'bio': '', 'is_additional': False}
+
+
+def _criteria(model):
+    """The filter the code applies to a collection (regular services only)."""
+    return (~Service.is_additional,) if model is Service else ()
+
+
+def hot_statements():
+    """Every statement worth checking, by name, built as the code builds it."""
+    now = datetime.now(timezone.utc)
+    since = SEED_ROWS - 10
+    statements = {
+        'additional_services_first': repository.first_view_select(AdditionalServicesView, Service.is_additional)[0],
+        'additional_services_patch': repository.patch_update(
+            Service, {'additional_services': 'x'}, 1, repository.singleton(Service, Service.is_additional)),
+        'job_claim': claim_update(now),
+        'tombstones_since': repository.deleted_select(since),
+    }
+    for model, view in SINGLETON_VIEWS.items():
+        name = model.__tablename__
+        statements[f'{name}_first'] = repository.first_view_select(view, full_image=model is Banner)[0]
+        statements[f'{name}_patch'] = repository.patch_update(
+            model, {PATCHED_FIELDS[model]: 'x'}, 1, repository.singleton(model))
+    for model, view in ORDERED_VIEWS.items():
+        name = model.__tablename__
+        criteria = _criteria(model)
+        statements[f'{name}_ordered'] = repository.ordered_views_select(view, *criteria)[0]
+        statements[f'{name}_page'] = repository.page_select(
+            model, (model.id, model.order_id), *criteria, after=(SEED_ROWS // 2, SEED_ROWS // 2), limit=50)
+        statements[f'{name}_first_page'] = repository.page_select(model, (model.id, model.order_id), *criteria, limit=50)
+        statements[f'{name}_changes'] = repository.changed_select(model, since)
+    for model in MEDIA_MODELS:
+        statements[f'{model.__tablename__}_media'] = repository.image_select(model, SEED_ROWS // 2)
+    return statements
+
+
+def _nodes(plan):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree."""
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _nodes(child)
+
+
+def _seq_scans(plan):
+    """The relation name of every Seq Scan node in a plan tree."""
+    return {node.get('Relation Name') for node in _nodes(plan) if node['Node Type'] == 'Seq Scan'}
+
+
+def _explain(connection, stmt):
+    compiled = stmt.compile(dialect=connection.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+def _seed(connection):
+    """Fill the growing tables (ordered collections, tombstones, finished jobs) and ANALYZE them."""
+    now = datetime.now(timezone.utc)
+    for model in ORDERED_VIEWS:
+        table = model.__table__
+        columns = [c.name for c in table.columns
+                   if c.name != 'id' and (c.name in SEED_VALUES or (c.default is None and c.server_default is None))]
+        rows = [dict({c: SEED_VALUES.get(c) for c in columns}, order_id=i + 1, change_seq=i + 1)
+                for i in range(SEED_ROWS)]
+        connection.execute(table.insert(), rows)
+    connection.execute(Service.__table__.insert(), [{'is_additional': True, 'additional_services': 'seed', 'order_id': 0}])
+    connection.execute(Tombstone.__table__.insert(), [
+        {'kind': 'event', 'row_id': i, 'change_seq': i + 1, 'deleted_at': now} for i in range(SEED_ROWS)])
+    connection.execute(Job.__table__.insert(), [
+        {'kind': 'seed', 'payload': '{}', 'status': 'done', 'attempts': 1, 'max_attempts': 5,
+         'run_after': now - timedelta(days=1), 'created_at': now, 'finished_at': now} for _ in range(SEED_ROWS)])
+    for model in (*ORDERED_VIEWS, Tombstone, Job):
+        connection.execute(text(f'ANALYZE "{model.__tablename__}"'))
+
+
+@pytest.fixture(scope='module')
+def connection():
+    with app.app_context():
+        assert db.engine.url.database == _url.database, f"refusing to migrate {db.engine.url}"
+        try:
+            connection = db.engine.connect()
+        except OperationalError as e:
+            pytest.skip(f"PostgreSQL at TEST_DATABASE_URL is not reachable: {e}")
+        transaction = connection.begin()
+        try:
+            config = app.extensions['migrate'].migrate.get_config()
+            config.attributes['connection'] = connection
+            command.upgrade(config, 'head')
+            _seed(connection)
+            yield connection
+        finally:
+            transaction.rollback()
+            connection.close()
+
+
+@pytest.mark.parametrize('name', sorted(hot_statements()))
+def test_hot_query_uses_indexes(connection, name):
+    plan = _explain(connection, hot_statements()[name])
+    seeded = {model.__tablename__ for model in (*ORDERED_VIEWS, Tombstone, Job)}
+    scanned = sorted(_seq_scans(plan[0]['Plan']) & seeded)
+    assert not scanned, f"{name} scans {', '.join(scanned)} sequentially:\n{json.dumps(plan, indent=2)}"
+
+
+@pytest.mark.parametrize('name', sorted(name for name in hot_statements() if name.endswith('page')))
+def test_pages_are_read_in_index_order(connection, name):
+    """A keyset page is an index range scan on (order_id, id): no sort, however deep the page."""
+    plan = _explain(connection, hot_statements()[name])
+    assert not any(node['Node Type'] in ('Sort', 'Incremental Sort') for node in _nodes(plan[0]['Plan'])), (
+        f"{name} sorts its rows:\n{json.dumps(plan, indent=2)}")
@@ -0,0 +1,339 @@
+# transfer.py
+# Export/import of all site content as a single zip archive, for backups and for copying content
+# between Neon, local Postgres and Cloud SQL:
+#   manifest.json    archive id, format, source migration revision and row counts
+#   content.ndjson   one {"table": ..., "row": {...}} object per line, table by table, rows by id
+#   blobs/<sha256>   every distinct image once, as raw bytes (stored, not recompressed); rows refer to
+#                    it as {"$blob": <sha256>, "prefix": "data:image/png;base64"}. Images stored as bytes
+#                    (see image_storage.py) travel the same way, under their text column's name.
+# Only content tables travel; the target's section versions, change sequence and tombstones are
+# advanced on import so caches, the CDN and syncing CMS clients all pick up the new content.
+import base64
+import binascii
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from datetime import datetime, timezone
+
+import click
+from sqlalchemy import func, select, text
+
+from content_version import MODEL_SECTIONS, bump_sections, next_change_seq
+from extensions import db
+from image_storage import IMAGE_FIELDS, data_url, storage_values
+from images import image_digest
+from models import Tombstone
+
+FORMAT = 1
+CONTENT_MODELS = tuple(MODEL_SECTIONS)
+# Data URLs at least this long are stored as blobs; shorter ones (LQIP placeholders) stay inline
+BLOB_MIN_LENGTH = 4096
+# Rows are inserted in batches of at most this many rows or (roughly) this many bytes of text
+BATCH_ROWS = 500
+BATCH_BYTES = 16 * 1024 * 1024
+
+
+# --- Values ---
+def _split_data_url(value):
+    """(prefix, bytes) for a large base64 data URL that re-encodes to exactly the same text, else None."""
+    if not isinstance(value, str) or len(value) < BLOB_MIN_LENGTH or not value.startswith('data:'):
+        return None
+    prefix, sep, payload = value.partition(',')
+    if not sep or not prefix.endswith(';base64'):
+        return None
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if base64.b64encode(data).decode('ascii') != payload:
+        return None  # non-canonical base64 (line breaks etc.): keep it inline so it round-trips exactly
+    return prefix, data
+
+
+def _write_blob(archive, blobs, data):
+    digest = hashlib.sha256(data).hexdigest()
+    if digest not in blobs:
+        archive.writestr(zipfile.ZipInfo(f'blobs/{digest}'), data, compress_type=zipfile.ZIP_STORED)
+        blobs.add(digest)
+    return digest
+
+
+def _datetime_columns(table):
+    return {column.name for column in table.columns if isinstance(column.type, db.DateTime)}
+
+
+# --- Export ---
+def export_content(path, connection):
+    """Write every content table to a zip archive at path; returns (row counts by table, blob count)."""
+    counts, blobs = {}, set()
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive, \
+            tempfile.SpooledTemporaryFile(max_size=BATCH_BYTES, mode='w+b') as ndjson:
+        for model in CONTENT_MODELS:
+            table = model.__table__
+            dates = _datetime_columns(table)
+            field = IMAGE_FIELDS.get(model)
+            counts[table.name] = 0
+            # Server-side cursor: one row (and so at most one image) in memory at a time
+            result = connection.execution_options(yield_per=100).execute(select(table).order_by(table.c.id))
+            for row in result.mappings():
+                row = dict(row)
+                if field:
+                    data, mime = row.pop(f'{field}_data'), row.pop(f'{field}_mime')
+                    if data is not None:
+                        data = bytes(data)
+                        if len(data) * 4 // 3 >= BLOB_MIN_LENGTH:
+                            row[field] = {"$blob": _write_blob(archive, blobs, data), "prefix": f"data:{mime};base64"}
+                        else:
+                            row[field] = data_url(mime, data)
+                for key, value in row.items():
+                    if key in dates and value is not None:
+                        row[key] = value.isoformat()
+                        continue
+                    blob = _split_data_url(value)
+                    if blob is None:
+                        continue
+                    prefix, data = blob
+                    row[key] = {"$blob": _write_blob(archive, blobs, data), "prefix": prefix}
+                line = json.dumps({"table": table.name, "row": row}, ensure_ascii=False, separators=(',', ':'))
+                ndjson.write(line.encode('utf-8') + b'\n')
+                counts[table.name] += 1
+        ndjson.seek(0)
+        with archive.open('content.ndjson', 'w', force_zip64=True) as entry:
+            shutil.copyfileobj(ndjson, entry)
+        revision = connection.execute(text("SELECT version_num FROM alembic_version")).scalar() \
+            if connection.dialect.has_table(connection, 'alembic_version') else None
+        manifest = {"id": uuid.uuid4().hex, "format": FORMAT, "revision": revision, "counts": counts,
+                    "blobs": len(blobs), "created_at": datetime.now(timezone.utc).isoformat()}
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+    return counts, len(blobs)
+
+
+# --- Import ---
+def _read_rows(archive):
+    with archive.open('content.ndjson') as entry:
+        for line in io.TextIOWrapper(entry, encoding='utf-8'):
+            record = json.loads(line)
+            yield record['table'], record['row']
+
+
+def _csv_field(value):
+    if value is None:
+        return ''  # unquoted empty field is NULL in COPY's CSV format; empty strings are quoted below
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, bytes):
+        return '\\x' + value.hex()  # bytea hex format
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _insert_rows(connection, table, rows):
+    """Insert rows with COPY when the driver supports it (psycopg2), otherwise as one executemany."""
+    if connection.dialect.driver == 'psycopg2':
+        driver_connection = connection.connection.driver_connection
+        columns = list(rows[0])
+        data = io.StringIO(''.join(','.join(_csv_field(row[c]) for c in columns) + '\n' for row in rows))
+        quoted = ', '.join(connection.dialect.identifier_preparer.quote(c) for c in columns)
+        with driver_connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {table.name} ({quoted}) FROM STDIN WITH (FORMAT csv)', data)
+    else:
+        connection.execute(table.insert(), rows)
+
+
+def _reset_sequences(connection):
+    """Move Postgres id sequences past the imported ids (SQLite does this by itself)."""
+    if connection.dialect.name != 'postgresql':
+        return
+    for model in CONTENT_MODELS:
+        name = model.__tablename__
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {name}"
+        ))
+
+
+class _ContentImport:
+    """Replaces the content tables with an archive's rows; see import_content."""
+
+    def __init__(self, connection, archive, manifest, progress_path):
+        self.connection = connection
+        self.archive = archive
+        self.manifest = manifest
+        self.progress_path = progress_path  # None: everything happens in the caller's single transaction
+        self.tables = {model.__tablename__: model.__table__ for model in CONTENT_MODELS}
+        self.models = {model.__tablename__: model for model in CONTENT_MODELS}
+
+    def _save_progress(self, state):
+        self.connection.commit()
+        with open(self.progress_path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.progress_path + '.tmp', self.progress_path)
+
+    def resumed_state(self):
+        if self.progress_path is None or not os.path.exists(self.progress_path):
+            return None
+        with open(self.progress_path) as f:
+            state = json.load(f)
+        if state.get('id') != self.manifest['id']:
+            raise click.ClickException(f"{self.progress_path} belongs to another archive; delete it to start over.")
+        # The tables were emptied first and are filled in archive order, so their row counts are exactly
+        # the rows already committed (even if the process died before recording the last batch)
+        state['loaded'] = {name: self.connection.scalar(select(func.count()).select_from(table))
+                           for name, table in self.tables.items()}
+        return state
+
+    def prepare(self):
+        """Empty the content tables, remembering their ids for tombstones, and take a change sequence number."""
+        removed = {}
+        for name, table in self.tables.items():
+            removed[name] = list(self.connection.scalars(select(table.c.id)))
+            self.connection.execute(table.delete())
+        state = {"id": self.manifest['id'], "seq": next_change_seq(self.connection), "removed": removed, "loaded": {}}
+        if self.progress_path:
+            self._save_progress(state)
+        return state
+
+    def _flush(self, state, name, batch):
+        if not batch:
+            return
+        _insert_rows(self.connection, self.tables[name], batch)
+        state['loaded'][name] = state['loaded'].get(name, 0) + len(batch)
+        if self.progress_path:
+            self._save_progress(state)
+
+    def load(self, state):
+        """Insert the archive's rows in batches, skipping rows an interrupted run already committed."""
+        skip = dict(state['loaded'])
+        current, batch, batch_bytes = None, [], 0
+        for name, row in _read_rows(self.archive):
+            if skip.get(name):
+                skip[name] -= 1
+                continue
+            table = self.tables.get(name)
+            if table is None:
+                raise click.ClickException(f"Archive has rows for unknown table {name!r}.")
+            if name != current or len(batch) >= BATCH_ROWS or batch_bytes >= BATCH_BYTES:
+                self._flush(state, current, batch)
+                current, batch, batch_bytes = name, [], 0
+            batch.append(self._decode(table, row, state['seq']))
+            batch_bytes += sum(len(value) for value in batch[-1].values() if isinstance(value, (str, bytes)))
+        self._flush(state, current, batch)
+
+    def _decode(self, table, row, seq):
+        dates = _datetime_columns(table)
+        decoded = {}
+        for key, value in row.items():
+            if key not in table.c:
+                continue  # column dropped in the target's schema
+            if isinstance(value, dict) and '$blob' in value and f'{key}_data' in table.c:
+                continue  # stored as bytes, see _store_image
+            if isinstance(value, dict) and '$blob' in value:
+                data = self.archive.read(f"blobs/{value['$blob']}")
+                value = f"{value['prefix']},{base64.b64encode(data).decode('ascii')}"
+            elif key in dates and value is not None:
+                value = datetime.fromisoformat(value)
+            decoded[key] = value
+        model = self.models[table.name]
+        field = IMAGE_FIELDS.get(model)
+        if field and f'{field}_data' in table.c:
+            self._store_image(table, field, row.get(field), decoded)
+        decoded['change_seq'] = seq  # newer than anything a syncing CMS client has seen on the target
+        return decoded
+
+    def _store_image(self, table, field, value, decoded):
+        """Set the image columns (text, bytes, type) of a decoded row; every row gets all of them."""
+        if isinstance(value, dict):
+            decoded[field] = None
+            decoded[f'{field}_data'] = self.archive.read(f"blobs/{value['$blob']}")
+            decoded[f'{field}_mime'] = value['prefix'][len('data:'):-len(';base64')]
+        else:
+            decoded.update(storage_values(field, decoded.get(field)))
+        if 'image_hash' in table.c:
+            # Archives from before content hashes were recorded: stored bytes are always linked from /media
+            data = decoded[f'{field}_data']
+            decoded['image_hash'] = decoded.get('image_hash') or (image_digest(data) if data is not None else None)
+
+    def finish(self, state):
+        """Tombstone replaced rows, fix id sequences and bump every section version."""
+        now = datetime.now(timezone.utc)
+        tombstones = []
+        for name, table in self.tables.items():
+            kept = set(self.connection.scalars(select(table.c.id)))
+            tombstones += [{"kind": name, "row_id": row_id, "change_seq": state['seq'], "deleted_at": now}
+                           for row_id in state['removed'].get(name, []) if row_id not in kept]
+        if tombstones:
+            self.connection.execute(Tombstone.__table__.insert(), tombstones)
+        _reset_sequences(self.connection)
+        bump_sections(self.connection, set(MODEL_SECTIONS.values()))
+        self.connection.commit()
+        if self.progress_path and os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+
+
+def import_content(path, connection, resumable=False):
+    """Replace the content tables with the rows of the archive at path; returns the row counts.
+
+    By default everything runs in one transaction. With resumable=True every batch is committed and
+    recorded in <path>.progress, and running the import again continues where it stopped.
+    """
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read('manifest.json'))
+        if manifest.get('format') != FORMAT:
+            raise click.ClickException(f"Unsupported archive format {manifest.get('format')!r}.")
+        job = _ContentImport(connection, archive, manifest, path + '.progress' if resumable else None)
+        state = job.resumed_state()
+        if state is None:
+            state = job.prepare()
+        else:
+            print(f"DEBUG: resuming import of {path} after {sum(state['loaded'].values())} rows")
+        job.load(state)
+        job.finish(state)
+    return manifest
+
+
+def _purge_everything():
+    try:
+        from cdn import purge_queue, section_key
+    except ImportError:
+        return
+    if purge_queue is not None:
+        purge_queue.add([section_key(section) for section in set(MODEL_SECTIONS.values())])
+        purge_queue.flush()
+
+
+# --- CLI ---
+@click.command('export-content')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+def export_content_command(path):
+    """Write all site content, images included, to a zip archive at PATH."""
+    with db.engine.connect() as connection:
+        counts, blobs = export_content(path, connection)
+    click.echo(f"Exported {sum(counts.values())} rows and {blobs} distinct images to {path} "
+               f"({os.path.getsize(path) / 1024 / 1024:.1f} MB).")
+
+
+@click.command('import-content')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--resumable', is_flag=True,
+              help='Commit every batch and record progress in PATH.progress, so a rerun continues an interrupted import.')
+@click.option('--yes', is_flag=True, help='Replace the current content without asking.')
+def import_content_command(path, resumable, yes):
+    """Replace all site content in the configured database with the archive at PATH."""
+    if not yes and not os.path.exists(path + '.progress'):
+        click.confirm(f"Replace all content in {db.engine.url.render_as_string(hide_password=True)}?", abort=True)
+    with db.engine.connect() as connection:
+        manifest = import_content(path, connection, resumable=resumable)
+        revision = connection.execute(text("SELECT version_num FROM alembic_version")).scalar() \
+            if connection.dialect.has_table(connection, 'alembic_version') else None
+    if manifest.get('revision') and revision and manifest['revision'] != revision:
+        click.echo(f"Warning: archive was exported at migration {manifest.get('revision')}, "
+                   f"this database is at {revision}.")
+    _purge_everything()
+    click.echo(f"Imported {sum(manifest['counts'].values())} rows from {path}.")